@@ -0,0 +1,55 @@
+"""
+Balanced clustering benchmark.
+Compares capacity-balanced KMeans with plain KMeans on synthetic employees.
+
+Usage: python -m benchmarks.balanced_clustering [n_employees] [capacity]
+"""
+import math
+import sys
+import time
+
+import numpy as np
+
+from utils.geo import LocalProjection
+from utils.kmeans import KMeansClusterer, BalancedKMeansClusterer
+
+
+def generate_employees(n, center=(41.05, 29.0), seed=42):
+    """Scatter employees around a few dense neighbourhoods of uneven size."""
+    rng = np.random.default_rng(seed)
+    hubs = center + rng.normal(0, 0.06, (12, 2))
+    shares = rng.dirichlet(np.full(len(hubs), 0.7))
+    hub = rng.choice(len(hubs), n, p=shares)
+    spread = rng.uniform(0.005, 0.03, len(hubs))[hub]
+    return hubs[hub] + rng.normal(0, 1, (n, 2)) * spread[:, None]
+
+
+def report(name, clusterer, seconds, capacity):
+    sizes = np.array(list(clusterer.get_cluster_sizes().values()))
+    over = sizes[sizes > capacity]
+    print(f"{name:10s} {seconds:8.2f} s  inertia {clusterer.inertia_ / 1e6:10.0f} km^2  "
+          f"sizes {sizes.min():4d}-{sizes.max():4d}  over capacity: {len(over):4d} clusters, "
+          f"{int((over - capacity).sum()):6d} employees")
+
+
+def main():
+    n_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    employees = generate_employees(n_employees)
+    coords = LocalProjection.around(employees).to_meters(employees)
+    n_clusters = math.ceil(n_employees / capacity * 1.05)
+    print(f"Employees: {n_employees}, clusters: {n_clusters}, capacity: {capacity}")
+
+    start = time.perf_counter()
+    kmeans = KMeansClusterer(n_clusters=n_clusters, n_init=3).fit(coords)
+    report("KMeans", kmeans, time.perf_counter() - start, capacity)
+
+    start = time.perf_counter()
+    balanced = BalancedKMeansClusterer(n_clusters=n_clusters, capacity=capacity).fit(coords)
+    report("Balanced", balanced, time.perf_counter() - start, capacity)
+    print(f"Balanced iterations: {balanced.n_iter_}")
+
+
+if __name__ == "__main__":
+    main()
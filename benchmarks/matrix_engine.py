@@ -0,0 +1,77 @@
+"""
+Matrix engine benchmark.
+Compares batched MatrixEngine distance matrices with per-pair shortest path queries.
+
+Usage: python -m benchmarks.matrix_engine [grid_size] [n_origins] [n_destinations]
+"""
+import sys
+import time
+
+import numpy as np
+
+from routing_engines.graph import RoadGraph
+from routing_engines.matrix import MatrixEngine
+from utils.geo import LocalProjection
+
+
+def build_grid_graph(size, spacing_m=100, origin=(41.0, 29.0)):
+    """Build a bidirectional grid road network of size x size nodes."""
+    lat0, lon0 = origin
+    dlat = spacing_m / LocalProjection.METERS_PER_DEGREE
+    dlon = spacing_m / (LocalProjection.METERS_PER_DEGREE * np.cos(np.radians(lat0)))
+
+    rows, cols = np.divmod(np.arange(size * size), size)
+    node_lat = lat0 + rows * dlat
+    node_lon = lon0 + cols * dlon
+
+    ids = np.arange(size * size)
+    right = ids[cols < size - 1]
+    down = ids[rows < size - 1]
+    u = np.concatenate([right, right + 1, down, down + size])
+    v = np.concatenate([right + 1, right, down + size, down])
+
+    rng = np.random.default_rng(0)
+    length = spacing_m * rng.uniform(0.9, 1.1, len(u))
+
+    return RoadGraph.from_edges(ids, node_lat, node_lon, u, v, length, np.full(len(u), 30.0))
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    n_origins = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    n_destinations = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    graph = build_grid_graph(size)
+    rng = np.random.default_rng(42)
+    origins = rng.integers(0, graph.n_nodes, n_origins)
+    destinations = rng.integers(0, graph.n_nodes, n_destinations)
+
+    print(f"Graph: {graph.n_nodes} nodes, {graph.n_edges} edges")
+    print(f"Matrix: {n_origins} x {n_destinations}")
+
+    engine = MatrixEngine(graph)
+    start = time.perf_counter()
+    matrix = engine.compute_nodes(origins, destinations)
+    batched_s = time.perf_counter() - start
+
+    pair_count = min(n_origins * n_destinations, 200)
+    start = time.perf_counter()
+    pair_distances = []
+    for k in range(pair_count):
+        i, j = divmod(k, n_destinations)
+        path, _ = graph.shortest_path(origins[i], destinations[j])
+        pair_distances.append(graph.path_length(path) if path is not None else np.nan)
+    per_pair_s = (time.perf_counter() - start) / pair_count * n_origins * n_destinations
+
+    print(f"MatrixEngine:     {batched_s * 1000:10.1f} ms")
+    print(f"Per-pair queries: {per_pair_s * 1000:10.1f} ms (extrapolated from {pair_count} pairs)")
+    print(f"Speedup:          {per_pair_s / batched_s:10.1f}x")
+
+    # Per-pair queries follow the fastest path, the engine the shortest one,
+    # so the engine can only be shorter or equal
+    batched = matrix.ravel()[:pair_count]
+    print(f"Max deviation:    {np.nanmax(np.asarray(pair_distances) - batched):10.2f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,21 @@ class Config:
     OFFICE_LOCATION = (41.1097, 29.0204)
     
     NUM_EMPLOYEES = 500
+    EMPLOYEE_FILE = None  # CSV/Parquet roster with id, lat, lon columns; None generates employees
+    INGEST_CHUNK_SIZE = 100_000
+    DEMAND_AGGREGATION_RADIUS = None  # meters; co-located employees are merged into one weighted point
     NUM_CLUSTERS = 25
+    CLUSTERING_ALGORITHM = "kmeans"  # 'kmeans', 'minibatch' (large employee sets) or 'balanced' (clusters fit VEHICLE_CAPACITY)
+    MINIBATCH_SIZE = 4096
+    AUTO_NUM_CLUSTERS = False  # choose the cluster count with find_optimal_clusters
+    MAX_CLUSTERS = 60
+    K_SELECTION_CRITERION = "elbow"  # 'elbow' or 'silhouette'
+    K_SELECTION_SAMPLE_SIZE = 20000
+    VEHICLE_CAPACITY = 50
+    INCREMENTAL_MAX_SPREAD = None  # meters; RMS distance to center that triggers local re-clustering
+    INCREMENTAL_REPAIR_NEIGHBORS = 2  # nearby clusters re-clustered together with an offending one
     MAX_DISTANCE_FROM_CENTER = None
+    SERVICE_RADIUS = None  # meters around OFFICE_LOCATION parsed from the pbf; None parses the whole file
     
     EMPLOYEES_PER_STOP = 2
     MIN_STOPS_PER_CLUSTER = 1
@@ -18,6 +31,29 @@ class Config:
     SNAP_STOPS_TO_ROADS = True
     ROAD_SNAP_MAX_DISTANCE = 500
     
+    ROUTING_ENGINE = "osrm"  # 'osrm' or 'local' (offline, built from OSM_FILE)
+    MATRIX_ENGINE = None  # engine for walking matrices; None uses ROUTING_ENGINE
+    MATRIX_DISTANCE_LIMIT = None  # meters; local matrix searches stop beyond this
+    MATRIX_WALK_LIMIT = 2 * MAX_WALK_DISTANCE  # meters; walking searches stop here when MATRIX_DISTANCE_LIMIT is None
+    OSM_FILE = "data/istanbul-center.osm.pbf"
+    REGION_BUNDLE_DIR = "data/bundles"  # compiled pbf extracts; None re-parses every run
+    OSRM_BASE_URL = "https://router.project-osrm.org"
+    HTTP_MAX_RETRIES = 3
+    HTTP_BACKOFF_FACTOR = 0.5
+    HTTP_TIMEOUT = 15
+    ROUTING_CONCURRENCY = 8
+    OSRM_MAX_TABLE_SIZE = 100
+    OSRM_PARALLEL_TILES = 4
+    HTTP_POOL_SIZE = ROUTING_CONCURRENCY * OSRM_PARALLEL_TILES  # one connection per in-flight request
+    
+    CACHE_MAX_ENTRIES = 50000
+    CACHE_MAX_BYTES = 256 * 1024 * 1024
+    CACHE_TTL_SECONDS = 30 * 24 * 3600
+    CACHE_MEMORY_MAX_ENTRIES = 2048
+    CACHE_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+    CACHE_QUANTIZE_METERS = None  # snap coordinates to this grid before keying
+    CACHE_NEAR_HIT_METERS = None  # reuse cached legs whose endpoints are this close
+    
     OUTPUT_DIR = "maps"
     MAP_EMPLOYEES = f"{OUTPUT_DIR}/employees.html"
     MAP_CLUSTERS = f"{OUTPUT_DIR}/clusters.html"
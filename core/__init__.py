@@ -1,7 +1,9 @@
 # Core domain models
 from core.employee import Employee
+from core.employee_table import EmployeeTable
 from core.cluster import Cluster
 from core.route import Route
 from core.vehicle import Vehicle
+from core.geometry import RouteGeometry
 
-__all__ = ['Employee', 'Cluster', 'Route', 'Vehicle']
+__all__ = ['Employee', 'EmployeeTable', 'Cluster', 'Route', 'Vehicle', 'RouteGeometry']
@@ -1,4 +1,8 @@
 """Cluster model - represents a group of employees assigned to a single route."""
+import numpy as np
+
+from core.employee_table import coordinates_of
+from utils.geo import distances_to_point
 
 
 class Cluster:
@@ -13,39 +17,79 @@ class Cluster:
         self.stops = []
         self.stop_assignments = {}
         self.stop_loads = []
+        
+        # Rows of the shared EmployeeTable, aligned with self.employees;
+        # table is None once employees from different tables are mixed
+        self.table = None
+        self.indices = np.empty(0, dtype=np.intp)
+    
+    def set_employees(self, table, indices):
+        """Assign rows of an EmployeeTable to this cluster in one step."""
+        self.table = table
+        self.indices = np.asarray(indices, dtype=np.intp)
+        table.cluster_id[self.indices] = self.id
+        self.employees = table.views(self.indices)
     
     def add_employee(self, employee):
         """Add an employee to this cluster."""
+        if not self.employees:
+            self.table = employee._table
+        if self.table is employee._table:
+            self.indices = np.append(self.indices, employee._index)
+        else:
+            self.table = None
+        
         self.employees.append(employee)
         employee.cluster_id = self.id
     
+    def replace_employees(self, employees):
+        """Replace every member of this cluster with the given employees."""
+        self.employees = []
+        self.table = None
+        self.indices = np.empty(0, dtype=np.intp)
+        for employee in employees:
+            self.add_employee(employee)
+    
     def remove_employee(self, employee):
         """Remove an employee from this cluster."""
         if employee in self.employees:
-            self.employees.remove(employee)
+            position = self.employees.index(employee)
+            self.employees.pop(position)
+            if self.table is not None:
+                self.indices = np.delete(self.indices, position)
             employee.cluster_id = None
     
-    def filter_by_distance(self, max_distance):
-        """Exclude employees who are too far from the cluster center."""
+    def filter_by_distance(self, max_distance, projection=None):
+        """
+        Exclude employees who are too far from the cluster center.
+        
+        Distances are planar meters in the given LocalProjection, or
+        haversine meters without one.
+        """
         excluded_count = 0
         center_lat, center_lon = self.center
         
-        for employee in self.employees:
-            distance = employee.distance_to(center_lat, center_lon)
-            if distance > max_distance:
-                employee.exclude(f"Too far from center ({distance:.0f}m)")
-                excluded_count += 1
+        measure = projection.distances_to_point if projection is not None else distances_to_point
+        distances = measure(self.get_employee_coordinates(include_excluded=True), center_lat, center_lon)
+        for index in np.flatnonzero(distances > max_distance):
+            self.employees[index].exclude(f"Too far from center ({distances[index]:.0f}m)")
+            excluded_count += 1
         
         return excluded_count
     
     def get_active_employees(self):
         """Return list of non-excluded employees."""
+        if self.table is not None:
+            active = np.flatnonzero(~self.table.excluded[self.indices])
+            return [self.employees[i] for i in active]
         return [emp for emp in self.employees if not emp.excluded]
     
     def get_employee_count(self, include_excluded=False):
         """Return count of employees in this cluster."""
         if include_excluded:
             return len(self.employees)
+        if self.table is not None:
+            return int(np.count_nonzero(~self.table.excluded[self.indices]))
         return len(self.get_active_employees())
     
     def get_employee_locations(self, include_excluded=False):
@@ -53,6 +97,17 @@ class Cluster:
         employees = self.employees if include_excluded else self.get_active_employees()
         return [emp.get_location() for emp in employees]
     
+    def get_employee_coordinates(self, include_excluded=False):
+        """Return an (n, 2) array of [lat, lon] rows for employees."""
+        if self.table is not None:
+            indices = self.indices
+            if not include_excluded:
+                indices = indices[~self.table.excluded[indices]]
+            return self.table.coords[indices]
+        
+        employees = self.employees if include_excluded else self.get_active_employees()
+        return coordinates_of(employees)
+    
     def assign_route(self, route):
         """Assign a route to this cluster."""
         self.route = route
@@ -1,25 +1,121 @@
 """Employee model - represents a single employee with location data."""
 import math
 
+import numpy as np
+
+from core.employee_table import EmployeeTable
+
 
 class Employee:
-    """Represents an employee with geographic location and pickup assignment."""
+    """
+    Represents an employee with geographic location and pickup assignment.
+    
+    An Employee is a view of one row of an EmployeeTable. Employees created
+    directly get a single-row table of their own.
+    """
+    
+    __slots__ = ('_table', '_index')
     
     def __init__(self, id, lat, lon, name=None):
-        self.id = id
-        self.lat = lat
-        self.lon = lon
-        self.name = name or f"Employee {id}"
-        self.cluster_id = None
-        self.excluded = False
-        self.exclusion_reason = ""
-        self.pickup_point = None
-        self.pickup_type = "route"  # 'route' (fallback) or 'stop' (safe osm stop)
+        self._table = EmployeeTable([id], [lat], [lon], names=[name])
+        self._index = 0
+    
+    @classmethod
+    def view(cls, table, index):
+        """Create an employee backed by row `index` of `table`."""
+        employee = cls.__new__(cls)
+        employee._table = table
+        employee._index = index
+        return employee
+    
+    @property
+    def id(self):
+        value = self._table.ids[self._index]
+        return value.item() if isinstance(value, np.generic) else value
+    
+    @id.setter
+    def id(self, value):
+        self._table.ids[self._index] = value
+    
+    @property
+    def lat(self):
+        return float(self._table.coords[self._index, 0])
+    
+    @lat.setter
+    def lat(self, value):
+        self._table.coords[self._index, 0] = value
+    
+    @property
+    def lon(self):
+        return float(self._table.coords[self._index, 1])
+    
+    @lon.setter
+    def lon(self, value):
+        self._table.coords[self._index, 1] = value
+    
+    @property
+    def name(self):
+        return self._table.names[self._index] or f"Employee {self.id}"
+    
+    @name.setter
+    def name(self, value):
+        self._table.names[self._index] = value
+    
+    @property
+    def raw_name(self):
+        """The stored name, or None when the employee has no name of its own."""
+        return self._table.names[self._index]
+    
+    @property
+    def cluster_id(self):
+        cluster_id = int(self._table.cluster_id[self._index])
+        return None if cluster_id < 0 else cluster_id
+    
+    @cluster_id.setter
+    def cluster_id(self, value):
+        self._table.cluster_id[self._index] = -1 if value is None else value
+    
+    @property
+    def excluded(self):
+        return bool(self._table.excluded[self._index])
+    
+    @excluded.setter
+    def excluded(self, value):
+        self._table.excluded[self._index] = value
+    
+    @property
+    def exclusion_reason(self):
+        return self._table.exclusion_reason[self._index]
+    
+    @exclusion_reason.setter
+    def exclusion_reason(self, value):
+        self._table.exclusion_reason[self._index] = value
+    
+    @property
+    def pickup_point(self):
+        lat = self._table.pickup_lat[self._index]
+        if math.isnan(lat):
+            return None
+        return (float(lat), float(self._table.pickup_lon[self._index]))
+    
+    @pickup_point.setter
+    def pickup_point(self, value):
+        lat, lon = (np.nan, np.nan) if value is None else value
+        self._table.pickup_lat[self._index] = lat
+        self._table.pickup_lon[self._index] = lon
+    
+    @property
+    def pickup_type(self):
+        """'route' (fallback) or 'stop' (safe osm stop)."""
+        return EmployeeTable.PICKUP_TYPES[self._table.pickup_type[self._index]]
+    
+    @pickup_type.setter
+    def pickup_type(self, value):
+        self._table.pickup_type[self._index] = EmployeeTable.PICKUP_TYPES.index(value)
     
     def set_pickup_point(self, lat, lon, type="route"):
         """Set the pickup point for this employee."""
-        self.pickup_point = (lat, lon)
-        self.pickup_type = type
+        self._table.set_pickups(self._index, lat, lon, type)
     
     def distance_to(self, other_lat, other_lon):
         """Calculate distance in meters to another point using Haversine formula."""
@@ -28,8 +124,8 @@ class Employee:
     
     def exclude(self, reason):
         """Mark employee as excluded from routing."""
-        self.excluded = True
-        self.exclusion_reason = reason
+        self._table.excluded[self._index] = True
+        self._table.exclusion_reason[self._index] = reason
     
     def get_location(self):
         """Return (lat, lon) tuple."""
@@ -0,0 +1,166 @@
+"""Employee table - columnar storage for employee locations and assignments."""
+import numpy as np
+
+
+class EmployeeTable:
+    """
+    Struct-of-arrays store for many employees.
+    
+    Every attribute of an employee lives in a NumPy column, so clustering,
+    filtering and distance code can work on whole arrays at once. Indexing or
+    iterating the table yields Employee views that read and write the
+    columns; views are created on first access and reused, so the same row
+    always returns the same object. Roster changes append rows and mask
+    departed ones, so existing row indices and views stay valid. Departed
+    rows are left out of len(), iteration, coordinates_of() and
+    to_dataframe(); indexing still addresses raw row numbers.
+    """
+    
+    PICKUP_TYPES = ('route', 'stop')
+    
+    def __init__(self, ids, lat, lon, names=None):
+        """
+        Args:
+            ids: Employee ids
+            lat, lon: Coordinates in degrees
+            names: Optional display names (defaults to "Employee <id>")
+        """
+        lat = np.asarray(lat, dtype=np.float64).ravel()
+        lon = np.asarray(lon, dtype=np.float64).ravel()
+        n = len(lat)
+        
+        self.ids = np.asarray(ids).ravel()
+        self.coords = np.column_stack([lat, lon])
+        self.names = np.full(n, None, dtype=object) if names is None else np.asarray(names, dtype=object).ravel()
+        self.cluster_id = np.full(n, -1, dtype=np.int32)
+        self.excluded = np.zeros(n, dtype=bool)
+        self.exclusion_reason = np.full(n, "", dtype=object)
+        self.pickup_lat = np.full(n, np.nan)
+        self.pickup_lon = np.full(n, np.nan)
+        self.pickup_type = np.zeros(n, dtype=np.int8)
+        self.removed = np.zeros(n, dtype=bool)
+        self._views = [None] * n
+    
+    @classmethod
+    def from_dataframe(cls, df, id_col='id', lat_col='lat', lon_col='lon', name_col=None):
+        """Create a table from a DataFrame with id, lat and lon columns."""
+        names = df[name_col].to_numpy() if name_col and name_col in df else None
+        return cls(df[id_col].to_numpy(), df[lat_col].to_numpy(), df[lon_col].to_numpy(), names=names)
+    
+    @property
+    def lat(self):
+        """Latitude column (a view into coords)."""
+        return self.coords[:, 0]
+    
+    @property
+    def lon(self):
+        """Longitude column (a view into coords)."""
+        return self.coords[:, 1]
+    
+    @property
+    def n_rows(self):
+        """Number of rows, including departed ones."""
+        return len(self.coords)
+    
+    def __len__(self):
+        return self.n_rows - int(self.removed.sum())
+    
+    def __getitem__(self, index):
+        """Return the Employee view of a row."""
+        index = int(index)
+        if index < 0:
+            index += self.n_rows
+        view = self._views[index]
+        if view is None:
+            from core.employee import Employee
+            view = Employee.view(self, index)
+            self._views[index] = view
+        return view
+    
+    def __iter__(self):
+        for index in self.present_indices():
+            yield self[index]
+    
+    def views(self, indices):
+        """Return Employee views for the given row indices."""
+        return [self[index] for index in indices]
+    
+    def active_indices(self):
+        """Row indices of employees not excluded from routing."""
+        return np.flatnonzero(~self.excluded & ~self.removed)
+    
+    def present_indices(self):
+        """Row indices of employees still on the roster."""
+        return np.flatnonzero(~self.removed)
+    
+    def rows_of(self, employees):
+        """Row indices of the given employees that are views of this table."""
+        return np.array([emp._index for emp in employees if emp._table is self], dtype=np.intp)
+    
+    def append(self, ids, lat, lon, names=None):
+        """Append employees as new rows and return their row indices."""
+        new = EmployeeTable(ids, lat, lon, names=names)
+        start = self.n_rows
+        
+        for column in ('ids', 'coords', 'names', 'cluster_id', 'excluded', 'exclusion_reason',
+                       'pickup_lat', 'pickup_lon', 'pickup_type', 'removed'):
+            setattr(self, column, np.concatenate([getattr(self, column), getattr(new, column)]))
+        self._views.extend(new._views)
+        
+        return np.arange(start, self.n_rows)
+    
+    def remove(self, indices):
+        """Mark rows as departed; they keep their index but leave the roster."""
+        self.removed[indices] = True
+        self.cluster_id[indices] = -1
+    
+    def set_pickups(self, indices, lat, lon, type="route"):
+        """Set pickup points for several rows at once."""
+        self.pickup_lat[indices] = lat
+        self.pickup_lon[indices] = lon
+        self.pickup_type[indices] = self.PICKUP_TYPES.index(type)
+    
+    def to_dataframe(self):
+        """Convert to a DataFrame with one row per employee."""
+        import pandas as pd
+        
+        rows = self.present_indices()
+        return pd.DataFrame({
+            'id': self.ids[rows],
+            'lat': self.lat[rows],
+            'lon': self.lon[rows],
+            'cluster_id': self.cluster_id[rows],
+            'excluded': self.excluded[rows],
+            'exclusion_reason': self.exclusion_reason[rows],
+            'pickup_lat': self.pickup_lat[rows],
+            'pickup_lon': self.pickup_lon[rows],
+            'pickup_type': np.asarray(self.PICKUP_TYPES)[self.pickup_type[rows]],
+        })
+    
+    def __repr__(self):
+        return (f"EmployeeTable(employees={len(self)}, "
+                f"excluded={int((self.excluded & ~self.removed).sum())})")
+
+
+def coordinates_of(employees):
+    """
+    Return an (n, 2) [lat, lon] array for a table or a sequence of employees.
+    
+    A table yields the rows still on the roster. Views of one shared table are gathered with a single index lookup
+    instead of reading every employee object.
+    """
+    if isinstance(employees, EmployeeTable):
+        if employees.removed.any():
+            return employees.coords[employees.present_indices()]
+        return employees.coords
+    
+    employees = list(employees)
+    if not employees:
+        return np.empty((0, 2), dtype=np.float64)
+    
+    table = employees[0]._table
+    if all(emp._table is table for emp in employees):
+        indices = np.fromiter((emp._index for emp in employees), dtype=np.intp, count=len(employees))
+        return table.coords[indices]
+    
+    return np.array([emp.get_location() for emp in employees], dtype=np.float64)
@@ -0,0 +1,144 @@
+"""Route geometry - compact polyline storage for route coordinates."""
+import numpy as np
+
+
+def encode_polyline(coords, precision=6):
+    """
+    Encode [lat, lon] coordinates as a Google encoded polyline string.
+
+    Args:
+        coords: Array-like of shape (n, 2) with [lat, lon] rows
+        precision: Number of decimals kept (6 matches OSRM's polyline6)
+
+    Returns:
+        Encoded polyline string
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(coords) == 0:
+        return ''
+
+    ints = np.round(coords * 10 ** precision).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # Each value is split into 5-bit chunks, low bits first, with 0x20 marking
+    # that another chunk follows
+    positions = np.arange(7)
+    chunks = (values[:, None] >> (5 * positions)) & 0x1f
+    n_chunks = 1 + np.sum(values[:, None] >= (1 << (5 * positions[1:])), axis=1)
+    used = positions < n_chunks[:, None]
+    more = positions < (n_chunks - 1)[:, None]
+    chars = (chunks | (more * 0x20)) + 63
+
+    return chars[used].astype(np.uint8).tobytes().decode('ascii')
+
+
+def decode_polyline(encoded, precision=6):
+    """
+    Decode a Google encoded polyline string.
+
+    Returns:
+        float64 array of shape (n, 2) with [lat, lon] rows
+    """
+    if not encoded:
+        return np.empty((0, 2), dtype=np.float64)
+
+    chars = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    is_last = chars < 0x20
+    starts = np.flatnonzero(np.concatenate(([True], is_last[:-1])))
+    group = np.cumsum(is_last) - is_last
+    shifts = 5 * (np.arange(len(chars)) - starts[group])
+
+    values = np.bitwise_or.reduceat((chars & 0x1f) << shifts, starts)
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / 10 ** precision
+
+
+class RouteGeometry:
+    """
+    Route polyline of [lat, lon] points.
+
+    Stored either as a float64 NumPy array or as an encoded polyline string;
+    whichever form is missing is computed on first use. The shapely
+    LineString used for geometric matching is built once and kept.
+    """
+
+    __slots__ = ('_coords', '_encoded', '_precision', '_line')
+
+    def __init__(self, coords=None, encoded=None, precision=6):
+        self._coords = None if coords is None else np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self._encoded = encoded
+        self._precision = precision
+        self._line = None
+
+        if self._coords is None and self._encoded is None:
+            self._coords = np.empty((0, 2), dtype=np.float64)
+
+    @classmethod
+    def from_polyline(cls, encoded, precision=6):
+        """Create a geometry from an encoded polyline string."""
+        return cls(encoded=encoded, precision=precision)
+
+    @classmethod
+    def from_any(cls, value):
+        """Create a geometry from a RouteGeometry, polyline string or coordinate list."""
+        if isinstance(value, RouteGeometry):
+            return value
+        if value is None:
+            return cls()
+        if isinstance(value, str):
+            return cls.from_polyline(value)
+        return cls(coords=value)
+
+    @classmethod
+    def concatenate(cls, geometries):
+        """Join geometries end to end, dropping consecutive repeated points."""
+        parts = [geometry.coords for geometry in geometries if len(geometry)]
+        if not parts:
+            return cls()
+
+        coords = np.concatenate(parts)
+        keep = np.ones(len(coords), dtype=bool)
+        keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+        return cls(coords=coords[keep])
+
+    @property
+    def coords(self):
+        """float64 array of shape (n, 2) with [lat, lon] rows."""
+        if self._coords is None:
+            self._coords = decode_polyline(self._encoded, self._precision)
+        return self._coords
+
+    @property
+    def line(self):
+        """Shapely LineString in (lat, lon) order, built on first use."""
+        if self._line is None:
+            from shapely.geometry import LineString
+            self._line = LineString(self.coords)
+        return self._line
+
+    def encode(self):
+        """Return the encoded polyline string."""
+        if self._encoded is None:
+            self._encoded = encode_polyline(self._coords, self._precision)
+        return self._encoded
+
+    def to_list(self):
+        """Return coordinates as a list of [lat, lon] lists."""
+        return self.coords.tolist()
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return iter(self.coords)
+
+    def __getitem__(self, index):
+        return self.coords[index]
+
+    def __repr__(self):
+        return f"RouteGeometry(points={len(self)})"
@@ -1,4 +1,21 @@
 """Route model - represents an optimized vehicle route."""
+import numpy as np
+
+from core.geometry import RouteGeometry
+from core.employee_table import coordinates_of
+from utils.stop_index import StopIndex
+from utils.aggregation import aggregate_points
+
+# Router shared by routes matched without an explicit router, created on first use
+_default_router = None
+
+
+def _get_default_router():
+    global _default_router
+    if _default_router is None:
+        from routing_engines.osrm import OSRMRouter
+        _default_router = OSRMRouter()
+    return _default_router
 
 
 class Route:
@@ -7,13 +24,23 @@ class Route:
     def __init__(self, cluster=None):
         self.cluster = cluster
         self.stops = []
-        self.coordinates = []
+        self.coordinates = None
         self.distance_km = 0.0
         self.duration_min = 0.0
         self.duration_no_traffic_min = 0.0
         self.traffic_delay_min = 0.0
         self.optimized = False
         self.has_traffic_data = False
+        self.matched_count = 0
+    
+    @property
+    def coordinates(self):
+        """Route polyline as a RouteGeometry."""
+        return self._coordinates
+    
+    @coordinates.setter
+    def coordinates(self, value):
+        self._coordinates = RouteGeometry.from_any(value)
     
     def set_stops(self, stops):
         """Set the list of stops for this route."""
@@ -69,12 +96,8 @@ class Route:
             self.duration_min = 0
             return
         
-        from utils.geo import haversine
-        total_distance = 0
-        for i in range(len(self.stops) - 1):
-            lat1, lon1 = self.stops[i]
-            lat2, lon2 = self.stops[i + 1]
-            total_distance += haversine(lat1, lon1, lat2, lon2)
+        from utils.geo import polyline_length
+        total_distance = polyline_length(self.stops)
         
         self.distance_km = total_distance / 1000
         avg_speed_kmh = 40
@@ -100,82 +123,88 @@ class Route:
     def to_dict(self):
         """Convert to dictionary representation."""
         return {
-            'coordinates': self.coordinates if self.coordinates else self.stops,
+            'coordinates': self.coordinates.to_list() if self.coordinates else self.stops,
             'stops': self.stops,
             'distance_km': self.distance_km,
             'duration_min': self.duration_min
         }
     
-    def match_employees_to_route(self, employees, safe_stops=None):
-        """Match employees to pickup points along the route."""
+    def match_employees_to_route(self, employees, safe_stops=None, router=None, aggregate_radius=None,
+                                 log=print):
+        """
+        Match employees to pickup points along the route.
+        
+        Args:
+            employees: List of Employee objects
+            safe_stops: Optional transit stops usable as pickup points, as a
+                StopIndex (shared between routes) or an array of [lat, lon] rows
+            router: Router used for walking distances (a shared OSRMRouter if None)
+            aggregate_radius: Optional radius in meters; employees this close
+                share one matrix row and are matched to the same stop
+            log: Callable receiving warnings and fallback messages
+        
+        Returns:
+            Number of matched employees
+        """
         if not self.coordinates or len(self.coordinates) < 2:
             return 0
         
         try:
-            from shapely.geometry import Point, LineString, MultiPoint
+            import shapely
+            from shapely.geometry import Point, MultiPoint
             from shapely.ops import nearest_points
             
-            line = LineString(self.coordinates)
+            line = self.coordinates.line
             matched_count = 0
             
             valid_route_stops = [s for s in self.stops] if self.stops else []
             
             # Add safe stops near the route
-            if safe_stops and len(safe_stops) > 0:
-                for s in safe_stops:
-                    s_point = Point(s[0], s[1])
-                    if line.distance(s_point) < 0.00015:
-                        valid_route_stops.append(s)
+            if safe_stops is not None and len(safe_stops) > 0:
+                if not isinstance(safe_stops, StopIndex):
+                    safe_stops = StopIndex(safe_stops)
+                near = safe_stops.within_line(line, 0.00015)
+                valid_route_stops.extend(tuple(s) for s in safe_stops.coords[near].tolist())
             
             # Filter stops to only those on the right side of the route
             if valid_route_stops:
-                filtered_stops = []
-                for s in valid_route_stops:
-                    s_point = Point(s[0], s[1])
-                    dist = line.project(s_point)
-                    
-                    delta = 1e-5
-                    p1 = line.interpolate(max(0, dist - delta))
-                    p2 = line.interpolate(min(line.length, dist + delta))
-                    
-                    vx = p2.x - p1.x
-                    vy = p2.y - p1.y
-                    wx = s_point.x - p1.x
-                    wy = s_point.y - p1.y
-                    
-                    cross_product = vx * wy - vy * wx
-                    
-                    if cross_product >= -1e-10:
-                        filtered_stops.append(s)
+                stop_coords = np.asarray(valid_route_stops, dtype=np.float64)
+                stop_points = shapely.points(stop_coords)
+                dist = shapely.line_locate_point(line, stop_points)
+                
+                delta = 1e-5
+                p1 = shapely.get_coordinates(shapely.line_interpolate_point(line, np.maximum(0, dist - delta)))
+                p2 = shapely.get_coordinates(shapely.line_interpolate_point(line, np.minimum(line.length, dist + delta)))
+                
+                v = p2 - p1
+                w = stop_coords - p1
+                cross_product = v[:, 0] * w[:, 1] - v[:, 1] * w[:, 0]
                 
-                valid_route_stops = filtered_stops
+                right_side = cross_product >= -1e-10
+                valid_route_stops = [s for s, keep in zip(valid_route_stops, right_side) if keep]
             
-            # Match employees to stops using OSRM distance matrix
+            # Match employees to stops using a walking distance matrix
             if valid_route_stops:
                 active_employees = [e for e in employees if not e.excluded]
                 
                 if not active_employees:
                     return 0
                     
-                from routing_engines.osrm import OSRMRouter
-                router = OSRMRouter()
+                if router is None:
+                    router = _get_default_router()
                 
-                emp_locs = [(e.lat, e.lon) for e in active_employees]
-                distances_matrix = router.get_distance_matrix(emp_locs, valid_route_stops, profile='foot')
+                demand = aggregate_points(coordinates_of(active_employees), aggregate_radius)
+                distances_matrix = router.get_distance_matrix(demand.coords, valid_route_stops, profile='foot', log=log)
                 
-                if distances_matrix:
-                    for i, employee in enumerate(active_employees):
-                        dists = distances_matrix[i]
-                        
-                        min_dist_meters = float('inf')
-                        best_stop_idx = -1
-                        
-                        for stop_idx, dist in enumerate(dists):
-                            if dist is not None and dist < min_dist_meters:
-                                min_dist_meters = dist
-                                best_stop_idx = stop_idx
-                        
-                        if best_stop_idx != -1:
+                if distances_matrix is not None:
+                    dists = np.where(np.isnan(distances_matrix), np.inf, distances_matrix)
+                    best_stop_indices = np.argmin(dists, axis=1)
+                    reachable = np.isfinite(dists[np.arange(len(dists)), best_stop_indices])
+                    best_stop_indices = demand.expand(best_stop_indices)
+                    reachable = demand.expand(reachable)
+                    
+                    for employee, best_stop_idx, ok in zip(active_employees, best_stop_indices, reachable):
+                        if ok:
                             best_stop = valid_route_stops[best_stop_idx]
                             employee.set_pickup_point(best_stop[0], best_stop[1], type="stop")
                             matched_count += 1
@@ -183,14 +212,14 @@ class Route:
                     return matched_count
             
             # Geometric fallback
-            print("Using geometric fallback for route matching...")
+            log("Using geometric fallback for route matching...")
             
             valid_stops_multipoint = None
             if valid_route_stops:
                 try:
                     valid_stops_multipoint = MultiPoint([(s[0], s[1]) for s in valid_route_stops])
                 except Exception as e:
-                    print(f"Error creating MultiPoint from stops: {e}")
+                    log(f"Error creating MultiPoint from stops: {e}")
             
             for employee in employees:
                 if employee.excluded:
@@ -214,10 +243,10 @@ class Route:
             return matched_count
             
         except ImportError:
-            print("Shapely module not found. Skipping route matching.")
+            log("Shapely module not found. Skipping route matching.")
             return 0
         except Exception as e:
-            print(f"Error matching employees to route: {e}")
+            log(f"Error matching employees to route: {e}")
             return 0
 
     def __repr__(self):
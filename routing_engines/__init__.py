@@ -1,5 +1,9 @@
 # Routing engine integrations
 from routing_engines.osrm import OSRMRouter
 from routing_engines.cache import APICache
+from routing_engines.transport import HTTPTransport
+from routing_engines.graph import RoadGraph
+from routing_engines.matrix import MatrixEngine
+from routing_engines.local import LocalRouter
 
-__all__ = ['OSRMRouter', 'APICache']
+__all__ = ['OSRMRouter', 'APICache', 'HTTPTransport', 'RoadGraph', 'MatrixEngine', 'LocalRouter']
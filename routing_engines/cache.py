@@ -1,37 +1,340 @@
 """API Cache - caches external API responses to reduce API calls."""
 import json
 import os
+import sqlite3
 import hashlib
+import math
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from datetime import datetime
 
+from utils.geo import LocalProjection, haversine
+
 
 class APICache:
-    """File-based cache for API responses."""
+    """
+    SQLite-backed cache for API responses.
+    
+    Every entry is its own row keyed by hash, so lookups and inserts cost the
+    same no matter how large the cache grows. Rows are only read when they are
+    requested, and writes are committed in batches of `commit_interval`.
+    
+    Both the on-disk store and the in-memory copy of recently used entries are
+    bounded: least recently used entries are evicted once an entry or byte
+    limit is exceeded, and entries older than their TTL are treated as misses.
+    
+    With `quantize_meters` set, coordinates are snapped to a grid of that size
+    before keying, so points that move by less than a cell share an entry.
+    With `near_hit_meters` set, leg endpoints are also recorded in a grid
+    index, and a leg lookup that misses reuses a cached leg whose endpoints
+    both lie within that distance.
+    """
     
-    def __init__(self, cache_file='data/api_cache.json'):
+    METERS_PER_DEGREE = LocalProjection.METERS_PER_DEGREE
+    
+    def __init__(self, cache_file='data/api_cache.db', legacy_file=None, commit_interval=50,
+                 max_entries=None, max_bytes=None, ttl=None,
+                 memory_max_entries=1024, memory_max_bytes=None,
+                 quantize_meters=None, near_hit_meters=None):
+        """
+        Args:
+            cache_file: Path of the SQLite database
+            legacy_file: Optional JSON cache file to import once on first use
+            commit_interval: Number of writes buffered before a commit
+            max_entries: Maximum number of entries kept on disk (None = unbounded)
+            max_bytes: Maximum serialized size of entries kept on disk
+            ttl: Default time-to-live of an entry in seconds (None = never expires)
+            memory_max_entries: Maximum number of entries kept in memory
+            memory_max_bytes: Maximum serialized size of entries kept in memory
+            quantize_meters: Grid size coordinates are snapped to before keying
+            near_hit_meters: Radius within which a cached leg may be reused
+        """
         self.cache_file = cache_file
-        self.cache = self._load_cache()
+        self.legacy_file = legacy_file
+        self.commit_interval = commit_interval
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_max_entries = memory_max_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.quantize_meters = quantize_meters
+        self.near_hit_meters = near_hit_meters
+        
+        # key -> (value, expires_at, size), ordered from least to most recently used
+        self.cache = OrderedDict()
+        self._memory_bytes = 0
+        self._touched = {}
+        self._pending_writes = 0
+        self._lock = threading.RLock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.near_hits = 0
+        
+        self._conn = self._connect()
+        self._disk_entries, self._disk_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        
+        if legacy_file:
+            self._migrate_legacy(legacy_file)
+        
+        # Commits and closes the connection when the cache is garbage
+        # collected or the interpreter exits, without keeping the cache alive
+        self._finalizer = weakref.finalize(self, _close_connection, self._conn, self._touched)
+    
+    def _connect(self):
+        """Open the database and create or upgrade the schema if needed."""
+        cache_dir = os.path.dirname(self.cache_file)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        
+        conn = sqlite3.connect(self.cache_file, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        
+        # Columns added for eviction; older databases are upgraded in place
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+        if 'accessed_at' not in columns:
+            conn.execute("ALTER TABLE entries ADD COLUMN accessed_at REAL")
+            conn.execute("UPDATE entries SET accessed_at = created_at")
+        if 'expires_at' not in columns:
+            conn.execute("ALTER TABLE entries ADD COLUMN expires_at REAL")
+        if 'size' not in columns:
+            conn.execute("ALTER TABLE entries ADD COLUMN size INTEGER")
+            conn.execute("UPDATE entries SET size = LENGTH(CAST(value AS BLOB))")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        
+        # Grid index of leg endpoints for near-hit lookups
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS anchors ("
+            "key TEXT NOT NULL, kind TEXT NOT NULL, position INTEGER NOT NULL, "
+            "lat REAL NOT NULL, lon REAL NOT NULL, cell_y INTEGER NOT NULL, cell_x INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_anchors_cell ON anchors (kind, position, cell_y, cell_x)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_anchors_key ON anchors (key)")
+        
+        conn.commit()
+        return conn
     
-    def _load_cache(self):
-        """Load cache from file."""
-        if os.path.exists(self.cache_file):
+    def _migrate_legacy(self, legacy_file):
+        """Import entries from an old JSON cache file exactly once."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE name = 'legacy_migrated'"
+            ).fetchone()
+            if row is not None or not os.path.exists(legacy_file):
+                return
+            
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(legacy_file, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
             except Exception as e:
-                print(f"Warning: cache could not be loaded: {e}")
-                return {}
-        return {}
+                print(f"Warning: legacy cache could not be migrated: {e}")
+                return
+            
+            for key, value in legacy.items():
+                self._write(key, value, commit=False)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('legacy_migrated', ?)",
+                (legacy_file,)
+            )
+            self.flush(force=True)
+            print(f"Migrated {len(legacy)} entries from {legacy_file}")
+    
+    def _remember(self, key, value, expires_at, size):
+        """Keep an entry in the in-memory LRU, evicting old entries if needed."""
+        if key in self.cache:
+            self._memory_bytes -= self.cache.pop(key)[2]
+        
+        self.cache[key] = (value, expires_at, size)
+        self._memory_bytes += size
+        
+        while self.cache and (
+            (self.memory_max_entries is not None and len(self.cache) > self.memory_max_entries) or
+            (self.memory_max_bytes is not None and self._memory_bytes > self.memory_max_bytes)
+        ):
+            _, (_, _, old_size) = self.cache.popitem(last=False)
+            self._memory_bytes -= old_size
+    
+    def _forget(self, key):
+        """Drop an entry from memory and disk."""
+        if key in self.cache:
+            self._memory_bytes -= self.cache.pop(key)[2]
+        self._touched.pop(key, None)
+        
+        row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM anchors WHERE key = ?", (key,))
+            self._disk_entries -= 1
+            self._disk_bytes -= row[0] or 0
+            self._pending_writes += 1
+    
+    def _record_lookup(self, hit):
+        """Count a lookup as a hit or a miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def _read(self, key, record=True):
+        """Return a stored entry, loading it from disk on first access."""
+        with self._lock:
+            now = time.time()
+            
+            if key in self.cache:
+                value, expires_at, size = self.cache[key]
+            else:
+                row = self._conn.execute(
+                    "SELECT value, expires_at, size FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    if record:
+                        self._record_lookup(False)
+                    return None
+                value, expires_at, size = json.loads(row[0]), row[1], row[2] or len(row[0])
+            
+            if expires_at is not None and expires_at <= now:
+                self._forget(key)
+                self.expirations += 1
+                if record:
+                    self._record_lookup(False)
+                return None
+            
+            self._remember(key, value, expires_at, size)
+            self._touched[key] = now
+            if record:
+                self._record_lookup(True)
+            return value
+    
+    def _write(self, key, value, ttl=None, commit=True, anchors=None):
+        """
+        Store an entry and commit once enough writes have accumulated.
+        
+        `anchors` are (kind, position, lat, lon) rows for near-hit lookup;
+        they are stored before eviction runs, so evicting the new entry
+        removes them too.
+        """
+        with self._lock:
+            now = time.time()
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = now + ttl if ttl is not None else None
+            serialized = json.dumps(value, ensure_ascii=False)
+            size = len(serialized.encode('utf-8'))
+            
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._disk_entries += 1
+            else:
+                self._disk_bytes -= row[0] or 0
+            
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, value, created_at, accessed_at, expires_at, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, serialized, now, now, expires_at, size)
+            )
+            self._disk_bytes += size
+            self._touched.pop(key, None)
+            self._remember(key, value, expires_at, size)
+            self._pending_writes += 1
+            
+            if anchors is not None:
+                self._conn.execute("DELETE FROM anchors WHERE key = ?", (key,))
+                self._conn.executemany(
+                    "INSERT INTO anchors (key, kind, position, lat, lon, cell_y, cell_x) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(key, kind, position, lat, lon, *self._anchor_cell(lat, lon))
+                     for kind, position, lat, lon in anchors]
+                )
+            
+            self._evict()
+            if commit and self._pending_writes >= self.commit_interval:
+                self.flush()
+    
+    def _over_disk_limits(self):
+        """Check whether the on-disk store exceeds its configured limits."""
+        return (
+            (self.max_entries is not None and self._disk_entries > self.max_entries) or
+            (self.max_bytes is not None and self._disk_bytes > self.max_bytes)
+        )
+    
+    def _evict(self):
+        """Delete least recently used entries until the disk limits hold."""
+        if not self._over_disk_limits():
+            return
+        
+        self._apply_touches()
+        while self._disk_entries > 0 and self._over_disk_limits():
+            excess = self._disk_entries - self.max_entries if self.max_entries is not None else 0
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at ASC LIMIT ?",
+                (max(excess, 16),)
+            ).fetchall()
+            if not rows:
+                break
+            
+            for key, size in rows:
+                if not self._over_disk_limits():
+                    break
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.execute("DELETE FROM anchors WHERE key = ?", (key,))
+                if key in self.cache:
+                    self._memory_bytes -= self.cache.pop(key)[2]
+                self._disk_entries -= 1
+                self._disk_bytes -= size or 0
+                self.evictions += 1
     
-    def _save_cache(self):
-        """Save cache to file."""
-        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
-            json.dump(self.cache, f, indent=2, ensure_ascii=False)
+    def _apply_touches(self):
+        """Write buffered access times so LRU order on disk is current."""
+        if self._touched:
+            _write_access_times(self._conn, self._touched)
+            self._pending_writes += 1
+    
+    def flush(self, force=False):
+        """Commit buffered writes and access times to disk."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._apply_touches()
+            if self._pending_writes or force:
+                self._conn.commit()
+                self._pending_writes = 0
+    
+    def close(self):
+        """Flush pending writes and close the database."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            self._finalizer()
+            self._conn = None
+    
+    def _format_point(self, lat, lon):
+        """Format a point for keying, snapped to the quantization grid if enabled."""
+        if not self.quantize_meters:
+            return f"{lat:.6f},{lon:.6f}"
+        
+        # Longitude cells are widened by 1/cos(lat) of their row so cells stay
+        # roughly square in meters
+        lat_step = self.quantize_meters / self.METERS_PER_DEGREE
+        row = round(lat / lat_step)
+        lon_step = lat_step / max(math.cos(math.radians(row * lat_step)), 1e-6)
+        return f"q{self.quantize_meters}:{row},{round(lon / lon_step)}"
     
     def _generate_key(self, points, departure_time):
         """Generate a unique cache key from points and time."""
-        coords_str = '_'.join([f"{lat:.6f},{lon:.6f}" for lat, lon in points])
+        coords_str = '_'.join([self._format_point(lat, lon) for lat, lon in points])
         time_str = departure_time.strftime('%Y-%m-%d-%H-%M') if departure_time else 'no-time'
         key_str = f"{coords_str}_{time_str}"
         return hashlib.md5(key_str.encode()).hexdigest()
@@ -39,56 +342,164 @@ class APICache:
     def get(self, points, departure_time):
         """Get cached result for given points and time."""
         key = self._generate_key(points, departure_time)
+        cached = self._read(key)
         
-        if key in self.cache:
-            cached_data = self.cache[key].copy()
+        if cached is not None:
+            cached_data = cached.copy()
             if 'departure_time' in cached_data and isinstance(cached_data['departure_time'], str):
                 cached_data['departure_time'] = datetime.fromisoformat(cached_data['departure_time'])
             return cached_data
         
         return None
     
-    def set(self, points, departure_time, data):
-        """Cache result for given points and time."""
+    def set(self, points, departure_time, data, ttl=None):
+        """Cache result for given points and time, optionally with its own TTL."""
         key = self._generate_key(points, departure_time)
         
         cache_data = data.copy()
         if 'departure_time' in cache_data and isinstance(cache_data['departure_time'], datetime):
             cache_data['departure_time'] = cache_data['departure_time'].isoformat()
         
-        self.cache[key] = cache_data
-        self._save_cache()
+        self._write(key, cache_data, ttl=ttl)
     
     def get_stats(self):
         """Return cache statistics."""
-        return {
-            'total_entries': len(self.cache),
-            'cache_file': self.cache_file,
-            'file_size_kb': os.path.getsize(self.cache_file) / 1024 if os.path.exists(self.cache_file) else 0
-        }
+        with self._lock:
+            self.flush()
+            lookups = self.hits + self.misses
+            stats = {
+                'total_entries': self._disk_entries,
+                'total_bytes': self._disk_bytes,
+                'loaded_entries': len(self.cache),
+                'loaded_bytes': self._memory_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'near_hits': self.near_hits,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'quantize_meters': self.quantize_meters,
+                'near_hit_meters': self.near_hit_meters,
+            }
+        
+        stats['cache_file'] = self.cache_file
+        stats['file_size_kb'] = os.path.getsize(self.cache_file) / 1024 if os.path.exists(self.cache_file) else 0
+        return stats
     
     def clear(self):
         """Clear all cached data."""
-        self.cache = {}
-        self._save_cache()
+        with self._lock:
+            self.cache = OrderedDict()
+            self._memory_bytes = 0
+            self._touched.clear()
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM anchors")
+            self._conn.commit()
+            self._pending_writes = 0
+            self._disk_entries = 0
+            self._disk_bytes = 0
         print("Cache cleared!")
-
+    
     def _generate_matrix_key(self, origins, destinations, profile):
         """Generate cache key for distance matrix."""
-        origins_str = '_'.join([f"{lat:.6f},{lon:.6f}" for lat, lon in origins])
-        dests_str = '_'.join([f"{lat:.6f},{lon:.6f}" for lat, lon in destinations])
+        origins_str = '_'.join([self._format_point(lat, lon) for lat, lon in origins])
+        dests_str = '_'.join([self._format_point(lat, lon) for lat, lon in destinations])
         key_str = f"matrix_{profile}_{origins_str}_{dests_str}"
         return hashlib.md5(key_str.encode()).hexdigest()
-
+    
     def get_matrix(self, origins, destinations, profile):
         """Get cached distance matrix."""
         key = self._generate_matrix_key(origins, destinations, profile)
-        if key in self.cache:
-            return self.cache[key]
-        return None
-
-    def set_matrix(self, origins, destinations, profile, data):
-        """Cache distance matrix result."""
+        return self._read(key)
+    
+    def set_matrix(self, origins, destinations, profile, data, ttl=None):
+        """Cache distance matrix result, optionally with its own TTL."""
         key = self._generate_matrix_key(origins, destinations, profile)
-        self.cache[key] = data
-        self._save_cache()
+        self._write(key, data, ttl=ttl)
+    
+    def _generate_leg_key(self, origin, destination, profile):
+        """Generate cache key for a single route leg."""
+        key_str = f"leg_{profile}_{self._format_point(*origin)}_{self._format_point(*destination)}"
+        return hashlib.md5(key_str.encode()).hexdigest()
+    
+    def _anchor_cell(self, lat, lon):
+        """Return the (row, column) of a point in the near-hit grid."""
+        step = self.near_hit_meters / self.METERS_PER_DEGREE
+        return math.floor(lat / step), math.floor(lon / step)
+    
+    def _find_near_leg(self, origin, destination, profile):
+        """Find a cached leg whose endpoints lie within `near_hit_meters`."""
+        # Grid cells are square in degrees, so a longitude degree is shorter in
+        # meters and the search has to span more columns than rows
+        spans = []
+        for lat, lon in (origin, destination):
+            row, col = self._anchor_cell(lat, lon)
+            col_span = math.ceil(1 / max(math.cos(math.radians(abs(lat) + 1)), 1e-6))
+            spans.append((row - 1, row + 1, col - col_span, col + col_span))
+        
+        with self._lock:
+            candidates = self._conn.execute(
+                "SELECT a.key, a.lat, a.lon, b.lat, b.lon FROM anchors a "
+                "JOIN anchors b ON b.key = a.key AND b.position = 1 "
+                "WHERE a.kind = ? AND a.position = 0 "
+                "AND a.cell_y BETWEEN ? AND ? AND a.cell_x BETWEEN ? AND ? "
+                "AND b.cell_y BETWEEN ? AND ? AND b.cell_x BETWEEN ? AND ?",
+                (f"leg_{profile}", *spans[0], *spans[1])
+            ).fetchall()
+            
+            best_key, best_distance = None, None
+            for key, a_lat, a_lon, b_lat, b_lon in candidates:
+                d_origin = haversine(origin[0], origin[1], a_lat, a_lon)
+                d_dest = haversine(destination[0], destination[1], b_lat, b_lon)
+                if d_origin <= self.near_hit_meters and d_dest <= self.near_hit_meters:
+                    if best_distance is None or d_origin + d_dest < best_distance:
+                        best_key, best_distance = key, d_origin + d_dest
+            
+            return self._read(best_key, record=False) if best_key else None
+    
+    def get_leg(self, origin, destination, profile):
+        """Get cached route leg between two points, falling back to a near hit."""
+        key = self._generate_leg_key(origin, destination, profile)
+        value = self._read(key, record=False)
+        
+        if value is None and self.near_hit_meters:
+            value = self._find_near_leg(origin, destination, profile)
+            if value is not None:
+                with self._lock:
+                    self.near_hits += 1
+        
+        self._record_lookup(value is not None)
+        return value
+    
+    def set_leg(self, origin, destination, profile, data, ttl=None):
+        """Cache route leg result, optionally with its own TTL."""
+        key = self._generate_leg_key(origin, destination, profile)
+        
+        anchors = None
+        if self.near_hit_meters:
+            anchors = [
+                (f"leg_{profile}", position, lat, lon)
+                for position, (lat, lon) in enumerate((origin, destination))
+            ]
+        
+        self._write(key, data, ttl=ttl, anchors=anchors)
+
+
+def _write_access_times(conn, touched):
+    """Write buffered access times and empty the buffer."""
+    conn.executemany(
+        "UPDATE entries SET accessed_at = ? WHERE key = ?",
+        ((accessed_at, key) for key, accessed_at in touched.items())
+    )
+    touched.clear()
+
+
+def _close_connection(conn, touched):
+    """Write pending access times, commit and close a cache connection."""
+    if touched:
+        _write_access_times(conn, touched)
+    conn.commit()
+    conn.close()
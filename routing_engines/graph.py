@@ -0,0 +1,232 @@
+"""Road Graph - compiled road network in CSR form for in-process routing."""
+import re
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from utils.geo import LocalProjection
+
+
+# Fallback driving speeds (km/h) by OSM highway class when maxspeed is missing
+HIGHWAY_SPEEDS_KMH = {
+    'motorway': 90, 'motorway_link': 50,
+    'trunk': 70, 'trunk_link': 40,
+    'primary': 50, 'primary_link': 35,
+    'secondary': 40, 'secondary_link': 30,
+    'tertiary': 35, 'tertiary_link': 25,
+    'unclassified': 30, 'residential': 25,
+    'living_street': 10, 'service': 15, 'road': 30,
+}
+DEFAULT_SPEED_KMH = 30
+
+# Constant travel speeds (km/h) for non-driving networks
+NETWORK_SPEEDS_KMH = {
+    'walking': 5,
+    'cycling': 15,
+}
+
+
+def _parse_maxspeed(value):
+    """Parse an OSM maxspeed tag into km/h, or None if it is not numeric."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    match = re.match(r'\s*(\d+(?:\.\d+)?)\s*(mph)?', str(value))
+    if not match:
+        return None
+    speed = float(match.group(1))
+    return speed * 1.609344 if match.group(2) else speed
+
+
+class RoadGraph:
+    """
+    Directed road network stored as CSR adjacency matrices.
+
+    `weights` holds the travel time of every edge in seconds and `lengths` the
+    edge length in meters; both share the same sparsity pattern so a path
+    found on one can be measured on the other.
+    """
+
+    def __init__(self, node_lat, node_lon, weights, lengths, network_type='driving'):
+        self.node_lat = np.asarray(node_lat, dtype=np.float64)
+        self.node_lon = np.asarray(node_lon, dtype=np.float64)
+        self.weights = weights
+        self.lengths = lengths
+        self.network_type = network_type
+
+        # Local equirectangular projection used only for nearest-node lookups
+        nodes = np.column_stack([self.node_lat, self.node_lon])
+        self._projection = LocalProjection.around(nodes) if len(nodes) else LocalProjection(0.0, 0.0)
+        self._tree = cKDTree(self._projection.to_meters(nodes))
+
+    @property
+    def n_nodes(self):
+        return len(self.node_lat)
+
+    @property
+    def n_edges(self):
+        return self.weights.nnz
+
+    @classmethod
+    def from_edges(cls, node_ids, node_lat, node_lon, u, v, length, speed_kmh, network_type='driving'):
+        """
+        Build a graph from directed edge arrays.
+
+        Args:
+            node_ids: OSM ids of the nodes
+            node_lat, node_lon: Node coordinates in degrees
+            u, v: OSM node ids of edge start and end
+            length: Edge lengths in meters
+            speed_kmh: Edge travel speeds in km/h
+            network_type: Name of the network ('driving', 'walking', 'cycling')
+
+        Returns:
+            RoadGraph
+        """
+        node_ids = np.asarray(node_ids)
+        order = np.argsort(node_ids)
+        sorted_ids = node_ids[order]
+
+        def to_index(ids):
+            pos = np.searchsorted(sorted_ids, ids)
+            pos = np.clip(pos, 0, len(sorted_ids) - 1)
+            found = sorted_ids[pos] == ids
+            return order[pos], found
+
+        src, src_found = to_index(np.asarray(u))
+        dst, dst_found = to_index(np.asarray(v))
+        valid = src_found & dst_found & (src != dst)
+
+        src, dst = src[valid], dst[valid]
+        # Explicit zeros are not edges in CSR form, so keep every length positive
+        length = np.maximum(np.asarray(length, dtype=np.float64)[valid], 0.01)
+        seconds = length / (np.asarray(speed_kmh, dtype=np.float64)[valid] / 3.6)
+
+        # Keep only the fastest of parallel edges; CSR construction would sum them
+        first = np.lexsort((seconds, dst, src))
+        src, dst, length, seconds = src[first], dst[first], length[first], seconds[first]
+        unique = np.ones(len(src), dtype=bool)
+        unique[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        src, dst, length, seconds = src[unique], dst[unique], length[unique], seconds[unique]
+
+        n = len(node_ids)
+        weights = csr_matrix((seconds, (src, dst)), shape=(n, n))
+        lengths = csr_matrix((length, (src, dst)), shape=(n, n))
+
+        return cls(node_lat, node_lon, weights, lengths, network_type=network_type)
+
+    @classmethod
+    def from_pyrosm(cls, osm_file, network_type='driving', bounding_box=None):
+        """
+        Parse a road network from an OSM pbf file with pyrosm.
+
+        Args:
+            osm_file: Path to the .osm.pbf file
+            network_type: pyrosm network type ('driving', 'walking', 'cycling')
+            bounding_box: Optional [minx, miny, maxx, maxy] to limit parsing
+
+        Returns:
+            RoadGraph
+        """
+        from pyrosm import OSM
+        from pyrosm.graphs import get_directed_edges
+
+        osm = OSM(osm_file, bounding_box=bounding_box)
+        nodes, edges = osm.get_network(network_type=network_type, nodes=True)
+        if edges is None or len(edges) == 0:
+            raise ValueError(f"No {network_type} network found in {osm_file}")
+
+        nodes, edges = get_directed_edges(nodes, edges, network_type=network_type)
+
+        if network_type in NETWORK_SPEEDS_KMH:
+            speed = np.full(len(edges), NETWORK_SPEEDS_KMH[network_type], dtype=np.float64)
+        else:
+            highway = edges['highway'].to_numpy() if 'highway' in edges else np.full(len(edges), None)
+            maxspeed = edges['maxspeed'].to_numpy() if 'maxspeed' in edges else np.full(len(edges), None)
+            speed = np.array([
+                _parse_maxspeed(limit) or HIGHWAY_SPEEDS_KMH.get(road, DEFAULT_SPEED_KMH)
+                for road, limit in zip(highway, maxspeed)
+            ], dtype=np.float64)
+
+        return cls.from_edges(
+            node_ids=nodes['id'].to_numpy(),
+            node_lat=nodes['lat'].to_numpy(),
+            node_lon=nodes['lon'].to_numpy(),
+            u=edges['u'].to_numpy(),
+            v=edges['v'].to_numpy(),
+            length=edges['length'].to_numpy(),
+            speed_kmh=speed,
+            network_type=network_type
+        )
+
+    def to_arrays(self):
+        """
+        Return the graph as flat NumPy arrays for persisting.
+
+        `weights` and `lengths` share one CSR structure, so only their data
+        arrays differ.
+        """
+        if not (np.array_equal(self.weights.indptr, self.lengths.indptr)
+                and np.array_equal(self.weights.indices, self.lengths.indices)):
+            raise ValueError("weights and lengths must share the same sparsity pattern")
+
+        return {
+            'node_lat': self.node_lat,
+            'node_lon': self.node_lon,
+            'indptr': self.weights.indptr,
+            'indices': self.weights.indices,
+            'weights': self.weights.data,
+            'lengths': self.lengths.data,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, network_type='driving'):
+        """Rebuild a graph from the arrays produced by to_arrays()."""
+        n = len(arrays['node_lat'])
+        structure = (arrays['indices'], arrays['indptr'])
+        weights = csr_matrix((arrays['weights'], *structure), shape=(n, n))
+        lengths = csr_matrix((arrays['lengths'], *structure), shape=(n, n))
+
+        return cls(arrays['node_lat'], arrays['node_lon'], weights, lengths, network_type=network_type)
+
+    def nearest_nodes(self, points):
+        """Return the index of the nearest graph node for each (lat, lon) point."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        _, indices = self._tree.query(self._projection.to_meters(points))
+        return indices
+
+    def shortest_path(self, source, target):
+        """
+        Find the fastest path between two node indices.
+
+        Returns:
+            Tuple of (list of node indices, travel time in seconds), or (None, inf)
+        """
+        if source == target:
+            return [source], 0.0
+
+        times, predecessors = dijkstra(
+            self.weights, directed=True, indices=source, return_predecessors=True
+        )
+        if not np.isfinite(times[target]):
+            return None, np.inf
+
+        path = [target]
+        while path[-1] != source:
+            path.append(predecessors[path[-1]])
+        path.reverse()
+
+        return path, float(times[target])
+
+    def path_length(self, path):
+        """Return the length in meters of a path given as node indices."""
+        if len(path) < 2:
+            return 0.0
+        path = np.asarray(path)
+        return float(np.asarray(self.lengths[path[:-1], path[1:]]).sum())
+
+    def node_coordinates(self, path):
+        """Return [lat, lon] pairs for a path given as node indices."""
+        path = np.asarray(path)
+        return np.column_stack([self.node_lat[path], self.node_lon[path]])
@@ -0,0 +1,157 @@
+"""Local Router - offline routing over road networks parsed from an OSM pbf."""
+import threading
+
+import numpy as np
+
+from core.geometry import RouteGeometry
+from routing_engines.graph import RoadGraph
+from routing_engines.matrix import MatrixEngine
+
+
+class LocalRouter:
+    """
+    In-process router with the same interface as OSRMRouter.
+
+    Driving, walking and cycling graphs are built from the pbf on first use
+    and kept for the lifetime of the router, so no request leaves the process.
+    """
+
+    PROFILE_NETWORKS = {
+        'driving': 'driving',
+        'car': 'driving',
+        'walking': 'walking',
+        'foot': 'walking',
+        'cycling': 'cycling',
+        'bike': 'cycling',
+    }
+
+    def __init__(self, osm_file="data/istanbul-center.osm.pbf", bounding_box=None, matrix_limit=None,
+                 bundle_dir=None, walking_limit=None):
+        """
+        Args:
+            osm_file: Path to the .osm.pbf file
+            bounding_box: Optional [minx, miny, maxx, maxy] to limit parsing
+            matrix_limit: Optional distance in meters beyond which matrix
+                searches stop and report the destination as unreachable
+            bundle_dir: Optional region bundle directory; graphs are loaded
+                from it when present and stored there after being built
+            walking_limit: Optional distance in meters for walking matrices
+                when matrix_limit is not set, so searches from each employee
+                stop within walking range instead of covering the whole city
+        """
+        self.osm_file = osm_file
+        self.bounding_box = bounding_box
+        self.matrix_limit = matrix_limit
+        self.walking_limit = walking_limit
+        self.bundle_dir = bundle_dir
+        self._graphs = {}
+        self._matrix_engines = {}
+        self._lock = threading.Lock()
+
+    def set_bounding_box(self, bounding_box):
+        """Change the parsing region; graphs that are already built keep theirs."""
+        with self._lock:
+            if not self._graphs:
+                self.bounding_box = bounding_box
+
+    def get_graph(self, profile, log=print):
+        """Return the road graph for a routing profile, building it on first use."""
+        network_type = self.PROFILE_NETWORKS.get(profile)
+        if network_type is None:
+            raise ValueError(f"Unsupported profile: {profile}")
+
+        with self._lock:
+            if network_type not in self._graphs:
+                self._graphs[network_type] = self._load_graph(network_type, log)
+            return self._graphs[network_type]
+
+    def _load_graph(self, network_type, log=print):
+        """Load a graph from the region bundle, or parse it and store it there."""
+        bundle = None
+        if self.bundle_dir:
+            from utils.region_bundle import RegionBundle
+            bundle = RegionBundle(self.osm_file, self.bundle_dir, bounding_box=self.bounding_box)
+            graph = bundle.load_graph(network_type)
+            if graph is not None:
+                return graph
+
+        log(f"Building local {network_type} graph from {self.osm_file}...")
+        graph = RoadGraph.from_pyrosm(
+            self.osm_file,
+            network_type=network_type,
+            bounding_box=self.bounding_box
+        )
+
+        if bundle is not None:
+            bundle.save_graph(graph)
+
+        return graph
+
+    def get_matrix_engine(self, profile, log=print):
+        """Return the matrix engine for a routing profile."""
+        graph = self.get_graph(profile, log)
+        with self._lock:
+            if graph.network_type not in self._matrix_engines:
+                self._matrix_engines[graph.network_type] = MatrixEngine(graph)
+            return self._matrix_engines[graph.network_type]
+
+    def get_route(self, points, profile='driving', log=print):
+        """
+        Get the fastest route through points in order.
+
+        Args:
+            points: List of (lat, lon) tuples
+            profile: Routing profile ('driving', 'walking', 'cycling')
+            log: Callable receiving progress messages
+
+        Returns:
+            Dict with 'coordinates' (RouteGeometry), 'distance_km', 'duration_min'
+        """
+        graph = self.get_graph(profile, log)
+        nodes = graph.nearest_nodes(points)
+
+        full_path = [nodes[0]]
+        total_seconds = 0.0
+        for source, target in zip(nodes[:-1], nodes[1:]):
+            path, seconds = graph.shortest_path(source, target)
+            if path is None:
+                raise Exception("No route found")
+            full_path.extend(path[1:])
+            total_seconds += seconds
+
+        return {
+            'coordinates': RouteGeometry(graph.node_coordinates(full_path)),
+            'distance_km': graph.path_length(full_path) / 1000,
+            'duration_min': total_seconds / 60
+        }
+
+    def get_distance_matrix(self, origins, destinations, profile='foot', log=print):
+        """
+        Get shortest-path distances between origins and destinations.
+
+        Args:
+            origins: List of (lat, lon) tuples
+            destinations: List of (lat, lon) tuples
+            profile: Routing profile
+            log: Callable receiving progress messages
+
+        Returns:
+            float32 NumPy array of shape (len(origins), len(destinations)) with
+            distances in meters (NaN where no route exists)
+        """
+        if len(origins) == 0 or len(destinations) == 0:
+            return np.empty((len(origins), len(destinations)), dtype=np.float32)
+
+        engine = self.get_matrix_engine(profile, log)
+        limit = self.matrix_limit
+        if limit is None and engine.graph.network_type == 'walking':
+            limit = self.walking_limit
+
+        return engine.compute(origins, destinations, limit=limit)
+
+    def get_stats(self):
+        """Return sizes of the graphs built so far."""
+        return {
+            network_type: {'nodes': graph.n_nodes, 'edges': graph.n_edges}
+            for network_type, graph in self._graphs.items()
+        }
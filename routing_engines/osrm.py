@@ -1,85 +1,179 @@
 """OSRM Router - Open Source Routing Machine integration."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import requests
+from core.geometry import RouteGeometry
 from routing_engines.cache import APICache
+from routing_engines.transport import HTTPTransport
 
 
 class OSRMRouter:
     """Client for OSRM routing API."""
     
-    def __init__(self, base_url="https://router.project-osrm.org", cache_enabled=True):
+    def __init__(self, base_url="https://router.project-osrm.org", cache_enabled=True, cache=None,
+                 transport=None, max_table_size=100, max_parallel_tiles=4):
+        """
+        Args:
+            base_url: OSRM server URL
+            cache_enabled: Create a default APICache when `cache` is not given
+            cache: APICache instance to use
+            transport: HTTPTransport instance to use
+            max_table_size: Maximum coordinates per /table request (OSRM's --max-table-size)
+            max_parallel_tiles: Number of matrix tiles fetched concurrently
+        """
         self.base_url = base_url
-        self.cache = APICache(cache_file='data/osrm_cache.json') if cache_enabled else None
+        self.max_table_size = max_table_size
+        self.max_parallel_tiles = max_parallel_tiles
+        self.transport = transport or HTTPTransport()
+        if cache is not None:
+            self.cache = cache
+        elif cache_enabled:
+            self.cache = APICache(
+                cache_file='data/osrm_cache.db',
+                legacy_file='data/osrm_cache.json'
+            )
+        else:
+            self.cache = None
     
-    def get_route(self, points, profile='driving'):
+    def _fetch_legs(self, points, profile):
+        """
+        Request a route through points and split it into per-leg results.
+        
+        Returns:
+            List of dicts with 'geometry' (RouteGeometry), 'distance_km' and
+            'duration_min', one for each consecutive pair of points
+        """
+        coords = ';'.join([f"{lon},{lat}" for lat, lon in points])
+        url = f"{self.base_url}/route/v1/{profile}/{coords}"
+        
+        # A single leg is the whole route; longer runs need step geometries
+        # to recover where each leg starts and ends
+        single_leg = len(points) == 2
+        params = {
+            'overview': 'full' if single_leg else 'false',
+            'steps': 'false' if single_leg else 'true',
+            'geometries': 'polyline6'
+        }
+        
+        data = self.transport.get_json(url, params=params)
+        
+        if 'routes' not in data or len(data['routes']) == 0:
+            raise Exception("No route found")
+        
+        route_data = data['routes'][0]
+        
+        legs = []
+        for leg in route_data['legs']:
+            if single_leg:
+                geometry = RouteGeometry.from_polyline(route_data['geometry'])
+            else:
+                geometry = RouteGeometry.concatenate(
+                    RouteGeometry.from_polyline(step['geometry']) for step in leg['steps']
+                )
+            
+            legs.append({
+                'geometry': geometry,
+                'distance_km': leg['distance'] / 1000,
+                'duration_min': leg['duration'] / 60
+            })
+        
+        return legs
+    
+    @staticmethod
+    def _leg_from_cache(cached):
+        """Rebuild a leg from its cached form (encoded polyline or coordinate list)."""
+        geometry = cached['geometry'] if 'geometry' in cached else cached.get('coordinates')
+        return {
+            'geometry': RouteGeometry.from_any(geometry),
+            'distance_km': cached['distance_km'],
+            'duration_min': cached['duration_min']
+        }
+    
+    @staticmethod
+    def _leg_to_cache(leg):
+        """Convert a leg to its cached form with an encoded polyline."""
+        return {
+            'geometry': leg['geometry'].encode(),
+            'distance_km': leg['distance_km'],
+            'duration_min': leg['duration_min']
+        }
+    
+    def get_route(self, points, profile='driving', log=print):
         """
         Get optimal route between points.
         
+        The route is assembled from legs between consecutive points. Legs are
+        cached individually, so only legs that are not cached yet are requested,
+        with each run of consecutive missing legs fetched in one call.
+        
         Args:
             points: List of (lat, lon) tuples
             profile: Routing profile ('driving', 'walking', 'cycling')
+            log: Callable receiving error messages
         
         Returns:
-            Dict with 'coordinates', 'distance_km', 'duration_min'
+            Dict with 'coordinates' (RouteGeometry), 'distance_km', 'duration_min'
         """
-        if self.cache:
-            cached_result = self.cache.get(points, departure_time=None)
-            if cached_result is not None:
-                return cached_result
+        points = [(float(lat), float(lon)) for lat, lon in points]
+        if len(points) < 2:
+            raise Exception("No route found")
         
-        coords = ';'.join([f"{lon},{lat}" for lat, lon in points])
-        url = f"{self.base_url}/route/v1/{profile}/{coords}"
+        legs = [None] * (len(points) - 1)
+        if self.cache:
+            for i in range(len(legs)):
+                cached = self.cache.get_leg(points[i], points[i + 1], profile)
+                legs[i] = self._leg_from_cache(cached) if cached is not None else None
         
-        params = {
-            'overview': 'full',
-            'geometries': 'geojson'
-        }
+        # Group consecutive missing legs into runs of [start, end)
+        runs = []
+        for i, leg in enumerate(legs):
+            if leg is not None:
+                continue
+            if runs and runs[-1][1] == i:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1])
         
         try:
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'routes' not in data or len(data['routes']) == 0:
-                raise Exception("No route found")
-            
-            route_data = data['routes'][0]
-            
-            # Convert coordinates from [lon, lat] to [lat, lon]
-            coordinates = [[coord[1], coord[0]] for coord in route_data['geometry']['coordinates']]
-            
-            distance_km = route_data['distance'] / 1000
-            duration_min = route_data['duration'] / 60
-            
-            result = {
-                'coordinates': coordinates,
-                'distance_km': distance_km,
-                'duration_min': duration_min
-            }
-            
-            if self.cache:
-                self.cache.set(points, departure_time=None, data=result)
-            
-            return result
+            for start, end in runs:
+                fetched = self._fetch_legs(points[start:end + 1], profile)
+                for offset, leg in enumerate(fetched):
+                    i = start + offset
+                    legs[i] = leg
+                    if self.cache:
+                        self.cache.set_leg(points[i], points[i + 1], profile, self._leg_to_cache(leg))
             
         except requests.exceptions.RequestException as e:
-            print(f"OSRM API error: {e}")
+            log(f"OSRM API error: {e}")
             raise
         except KeyError as e:
-            print(f"Unexpected OSRM response format: {e}")
+            log(f"Unexpected OSRM response format: {e}")
             raise
-            
-    def get_distance_matrix(self, origins, destinations, profile='foot'):
-        """
-        Get distance matrix between origins and destinations.
         
-        Args:
-            origins: List of (lat, lon) tuples
-            destinations: List of (lat, lon) tuples
-            profile: Routing profile
+        return {
+            'coordinates': RouteGeometry.concatenate(leg['geometry'] for leg in legs),
+            'distance_km': sum(leg['distance_km'] for leg in legs),
+            'duration_min': sum(leg['duration_min'] for leg in legs)
+        }
+    
+    def _matrix_tile_shape(self, n_origins, n_destinations):
+        """Pick tile dimensions so sources + destinations fit `max_table_size`."""
+        half = max(1, self.max_table_size // 2)
         
-        Returns:
-            2D list of distances in meters
-        """
+        if n_destinations <= half:
+            cols = n_destinations
+            rows = max(1, self.max_table_size - cols)
+        elif n_origins <= half:
+            rows = n_origins
+            cols = max(1, self.max_table_size - rows)
+        else:
+            rows = cols = half
+        
+        return min(rows, n_origins), min(cols, n_destinations)
+    
+    def _fetch_matrix_tile(self, origins, destinations, profile):
+        """Fetch (or load from cache) a single table request."""
         if self.cache:
             cached_result = self.cache.get_matrix(origins, destinations, profile)
             if cached_result is not None:
@@ -99,21 +193,73 @@ class OSRMRouter:
             'annotations': 'distance'
         }
         
+        data = self.transport.get_json(url, params=params)
+        
+        if 'code' in data and data['code'] != 'Ok':
+            raise Exception(f"OSRM Error: {data.get('message', 'Unknown error')}")
+        
+        result = data['distances']
+        
+        if self.cache:
+            self.cache.set_matrix(origins, destinations, profile, result)
+        
+        return result
+    
+    def get_distance_matrix(self, origins, destinations, profile='foot', log=print):
+        """
+        Get distance matrix between origins and destinations.
+        
+        Large requests are split into tiles of at most `max_table_size`
+        coordinates, fetched in parallel and stitched together. Each tile is
+        cached on its own, so overlapping requests reuse tiles.
+        
+        Args:
+            origins: List of (lat, lon) tuples
+            destinations: List of (lat, lon) tuples
+            profile: Routing profile
+            log: Callable receiving error messages
+        
+        Returns:
+            NumPy array of shape (len(origins), len(destinations)) with distances
+            in meters (NaN where no route exists), or None on failure
+        """
+        origins = [(float(lat), float(lon)) for lat, lon in origins]
+        destinations = [(float(lat), float(lon)) for lat, lon in destinations]
+        
+        if not origins or not destinations:
+            return np.empty((len(origins), len(destinations)))
+        
+        rows, cols = self._matrix_tile_shape(len(origins), len(destinations))
+        tiles = [
+            (i, j)
+            for i in range(0, len(origins), rows)
+            for j in range(0, len(destinations), cols)
+        ]
+        
+        def fetch(tile):
+            i, j = tile
+            return self._fetch_matrix_tile(origins[i:i + rows], destinations[j:j + cols], profile)
+        
         try:
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'code' in data and data['code'] != 'Ok':
-                raise Exception(f"OSRM Error: {data.get('message', 'Unknown error')}")
-            
-            result = data['distances']
-            
-            if self.cache:
-                self.cache.set_matrix(origins, destinations, profile, result)
-                
-            return result
-            
+            if len(tiles) == 1 or self.max_parallel_tiles <= 1:
+                results = [fetch(tile) for tile in tiles]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_parallel_tiles, len(tiles))) as executor:
+                    results = list(executor.map(fetch, tiles))
         except Exception as e:
-            print(f"OSRM Matrix API error: {e}")
+            log(f"OSRM Matrix API error: {e}")
             return None
+        
+        matrix = np.full((len(origins), len(destinations)), np.nan)
+        for (i, j), tile in zip(tiles, results):
+            block = np.array(tile, dtype=float)
+            matrix[i:i + block.shape[0], j:j + block.shape[1]] = block
+        
+        return matrix
+
+    def get_stats(self):
+        """Return cache and transport statistics."""
+        return {
+            'cache': self.cache.get_stats() if self.cache else None,
+            'transport': self.transport.get_metrics()
+        }
@@ -0,0 +1,139 @@
+"""HTTP Transport - pooled, retrying HTTP client for routing APIs."""
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPTransport:
+    """
+    Persistent HTTP session with connection pooling, retries and latency metrics.
+
+    Connections are kept alive and reused across calls. When every pooled
+    connection is in use, further requests wait for one to be returned
+    instead of opening throwaway connections. Responses with a
+    retryable status (429/5xx) and connection errors are retried with
+    exponential backoff and full jitter, honouring `Retry-After` when the
+    server sends one.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=10, max_retries=3, backoff_factor=0.5, max_backoff=10.0,
+                 timeout=15, latency_window=1000):
+        """
+        Args:
+            pool_size: Maximum number of connections per host
+            max_retries: Number of retries after the first attempt
+            backoff_factor: Base delay in seconds, doubled on every retry
+            max_backoff: Upper bound for a single retry delay in seconds
+            timeout: Request timeout in seconds
+            latency_window: Number of recent latencies kept for percentiles
+        """
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self.request_count = 0
+        self.error_count = 0
+        self.retry_count = 0
+        self.total_latency_s = 0.0
+
+    def _record(self, latency_s, error=False):
+        """Record the latency of a single HTTP attempt."""
+        with self._lock:
+            self._latencies.append(latency_s)
+            self.request_count += 1
+            self.total_latency_s += latency_s
+            if error:
+                self.error_count += 1
+
+    def _backoff(self, attempt, retry_after=None):
+        """Sleep before the next attempt using exponential backoff with jitter."""
+        delay = self._random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+        if retry_after is not None:
+            try:
+                delay = max(delay, min(self.max_backoff, float(retry_after)))
+            except ValueError:
+                pass
+
+        with self._lock:
+            self.retry_count += 1
+        time.sleep(delay)
+
+    def get(self, url, params=None):
+        """
+        Send a GET request, retrying transient failures.
+
+        Args:
+            url: Request URL
+            params: Optional query parameters
+
+        Returns:
+            requests.Response with a successful status code
+        """
+        attempt = 0
+
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._record(time.perf_counter() - start, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                self._backoff(attempt)
+                attempt += 1
+                continue
+
+            retryable = response.status_code in self.RETRY_STATUSES
+            self._record(time.perf_counter() - start, error=response.status_code >= 400)
+
+            if retryable and attempt < self.max_retries:
+                self._backoff(attempt, response.headers.get('Retry-After'))
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def get_json(self, url, params=None):
+        """Send a GET request and return the decoded JSON body."""
+        return self.get(url, params=params).json()
+
+    def get_metrics(self):
+        """Return request counts and latency statistics in milliseconds."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            count = self.request_count
+            metrics = {
+                'requests': count,
+                'errors': self.error_count,
+                'retries': self.retry_count,
+                'mean_ms': (self.total_latency_s / count) * 1000 if count else 0.0,
+            }
+
+        if latencies:
+            metrics['p50_ms'] = latencies[len(latencies) // 2] * 1000
+            metrics['p95_ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            metrics['max_ms'] = latencies[-1] * 1000
+
+        return metrics
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
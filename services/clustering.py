@@ -1,7 +1,13 @@
 """Clustering Service - handles employee clustering operations."""
+import math
 import numpy as np
+from scipy.optimize import linear_sum_assignment
 from core.cluster import Cluster
-from utils.kmeans import KMeansClusterer
+from core.employee_table import EmployeeTable, coordinates_of
+from utils.kmeans import KMeansClusterer, MiniBatchKMeansClusterer, BalancedKMeansClusterer
+from utils.aggregation import aggregate_points
+from utils.k_selection import select_k
+from utils.geo import LocalProjection
 
 
 class ClusteringService:
@@ -9,61 +15,242 @@ class ClusteringService:
     
     def __init__(self, config):
         self.config = config
-        self.algorithm = 'kmeans'
+        self.algorithm = config.CLUSTERING_ALGORITHM
         self.clusterer = None
+        # Clustering runs in planar meters around the office
+        self.projection = LocalProjection(*config.OFFICE_LOCATION)
+        # Cluster centers in meters, moved by incremental repairs
+        self.centers = None
     
     def cluster_employees(self, employees, num_clusters, random_state=None):
         """
         Cluster employees into groups.
         
         Args:
-            employees: List of Employee objects
+            employees: EmployeeTable or list of Employee objects
             num_clusters: Number of clusters to create
             random_state: Random seed for reproducibility
         
         Returns:
             List of Cluster objects with employees assigned
         """
+        if self.algorithm == 'balanced':
+            # Every cluster must fit in one vehicle
+            min_clusters = math.ceil(len(coordinates_of(employees)) / self.config.VEHICLE_CAPACITY)
+            if num_clusters < min_clusters:
+                print(f"    Raising cluster count to {min_clusters} to fit {self.config.VEHICLE_CAPACITY}-seat vehicles")
+                num_clusters = min_clusters
+        
+        self.clusterer = self._create_clusterer(num_clusters, random_state)
+        return self._fit_clusters(employees, num_clusters)
+    
+    def _create_clusterer(self, num_clusters, random_state):
+        """Create the clusterer for the configured algorithm."""
         if self.algorithm == 'kmeans':
-            return self._cluster_kmeans(employees, num_clusters, random_state)
-        else:
-            raise ValueError(f"Unsupported algorithm: {self.algorithm}")
+            return KMeansClusterer(
+                n_clusters=num_clusters,
+                random_state=random_state
+            )
+        if self.algorithm == 'minibatch':
+            return MiniBatchKMeansClusterer(
+                n_clusters=num_clusters,
+                random_state=random_state,
+                batch_size=self.config.MINIBATCH_SIZE
+            )
+        if self.algorithm == 'balanced':
+            return BalancedKMeansClusterer(
+                n_clusters=num_clusters,
+                capacity=self.config.VEHICLE_CAPACITY,
+                random_state=random_state
+            )
+        raise ValueError(f"Unsupported algorithm: {self.algorithm}")
     
-    def _cluster_kmeans(self, employees, num_clusters, random_state):
-        """Perform KMeans clustering."""
-        self.clusterer = KMeansClusterer(
-            n_clusters=num_clusters,
-            random_state=random_state
-        )
-        coordinates = np.array([[emp.lat, emp.lon] for emp in employees])
+    def _fit_clusters(self, employees, num_clusters):
+        """Fit the clusterer and build Cluster objects from its labels."""
+        # Co-located employees are fitted once, weighted by their count.
+        # Balanced clustering counts seats, so it keeps every employee.
+        radius = None if self.algorithm == 'balanced' else self.config.DEMAND_AGGREGATION_RADIUS
+        # Table rows aligned with coordinates_of(employees)
+        rows = employees.present_indices() if isinstance(employees, EmployeeTable) else None
+        coords = coordinates_of(employees)
+        demand = aggregate_points(coords, radius, self.projection)
+        if len(demand) < len(coords):
+            print(f"    Aggregated {len(coords)} employees into {len(demand)} demand points")
         
-        self.clusterer.fit(coordinates)
+        sample_weight = None if self.algorithm == 'balanced' else demand.weights
+        self.clusterer.fit(self.projection.to_meters(demand.coords), sample_weight=sample_weight)
+        labels = demand.expand(self.clusterer.labels_)
+        self.centers = np.array(self.clusterer.cluster_centers_, dtype=np.float64)
+        centers = self.projection.to_latlon(self.centers)
         
         # Create cluster objects
         clusters = []
         for i in range(num_clusters):
-            center = tuple(self.clusterer.cluster_centers_[i])
+            center = tuple(centers[i])
             cluster = Cluster(id=i, center=center)
             clusters.append(cluster)
         
         # Assign employees to clusters
-        for employee, cluster_id in zip(employees, self.clusterer.labels_):
-            clusters[cluster_id].add_employee(employee)
+        if rows is not None:
+            order = np.argsort(labels, kind='stable')
+            bounds = np.searchsorted(labels[order], np.arange(num_clusters + 1))
+            for cluster in clusters:
+                cluster.set_employees(employees, rows[order[bounds[cluster.id]:bounds[cluster.id + 1]]])
+        else:
+            for employee, cluster_id in zip(employees, labels):
+                clusters[cluster_id].add_employee(employee)
         
         return clusters
     
-    def find_optimal_clusters(self, employees, max_clusters=15):
-        """Find optimal number of clusters using elbow method."""
-        coordinates = np.array([[emp.lat, emp.lon] for emp in employees])
-        
-        inertias = []
-        for k in range(1, min(max_clusters + 1, len(employees))):
-            clusterer = KMeansClusterer(n_clusters=k, random_state=42)
-            clusterer.fit(coordinates)
-            inertias.append(clusterer.inertia_)
-        
-        # TODO: Implement elbow detection
-        return self.config.NUM_CLUSTERS
+    def update_clusters(self, clusters, added=(), removed=(), max_size=None, max_spread=None):
+        """
+        Apply roster changes to existing clusters instead of re-clustering everyone.
+        
+        Departed employees leave their clusters and new employees join the
+        cluster with the nearest center; an address change is a removal plus
+        an addition. A cluster that this update pushes over max_size
+        employees, or over max_spread RMS distance to its center, is
+        re-clustered together with its nearest neighbours under a balanced
+        size limit. Clusters that were already over a limit are left alone.
+        All other clusters keep their employees and centers, so their routes
+        stay valid.
+        
+        Args:
+            clusters: Clusters returned by cluster_employees
+            added: Employees joining the roster
+            removed: Employees leaving the roster
+            max_size: Employees per cluster (defaults to config.VEHICLE_CAPACITY)
+            max_spread: RMS spread limit in meters (defaults to
+                config.INCREMENTAL_MAX_SPREAD; None disables the check)
+        
+        Returns:
+            Dict with the sorted ids of 'changed' and 'repaired' clusters and
+            the 'added'/'removed' counts
+        """
+        if self.clusterer is None:
+            raise ValueError("Employees have not been clustered yet!")
+        
+        max_size = max_size or self.config.VEHICLE_CAPACITY
+        max_spread = max_spread if max_spread is not None else self.config.INCREMENTAL_MAX_SPREAD
+        by_id = {cluster.id: cluster for cluster in clusters}
+        
+        removed = [employee for employee in removed if employee.cluster_id in by_id]
+        added = list(added)
+        if added:
+            xy = self.projection.to_meters(coordinates_of(added))
+            labels = np.argmin(((xy[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+        else:
+            labels = np.empty(0, dtype=np.intp)
+        
+        changed = {employee.cluster_id for employee in removed} | {int(label) for label in labels}
+        over_before = {cluster_id: self._over_limits(by_id[cluster_id], max_size, max_spread)
+                       for cluster_id in changed}
+        
+        for employee in removed:
+            by_id[employee.cluster_id].remove_employee(employee)
+        for employee, cluster_id in zip(added, labels):
+            by_id[int(cluster_id)].add_employee(employee)
+        
+        repaired = set()
+        for cluster_id in sorted(changed):
+            over_now = self._over_limits(by_id[cluster_id], max_size, max_spread)
+            if any(now and not before for now, before in zip(over_now, over_before[cluster_id])):
+                repaired.update(self._repair_cluster(by_id, cluster_id, max_size))
+        
+        return {
+            'changed': sorted(changed | repaired),
+            'repaired': sorted(repaired),
+            'added': len(added),
+            'removed': len(removed)
+        }
+    
+    def _over_limits(self, cluster, max_size, max_spread):
+        """Return whether a cluster is over the (size, spread) limits."""
+        over_size = cluster.get_employee_count(include_excluded=True) > max_size
+        if max_spread is None or not cluster.employees:
+            return over_size, False
+        
+        distances = self.projection.distances_to_point(
+            cluster.get_employee_coordinates(include_excluded=True), *cluster.center
+        )
+        return over_size, float(np.sqrt(np.mean(distances ** 2))) > max_spread
+    
+    def _repair_cluster(self, by_id, cluster_id, max_size):
+        """Re-cluster a cluster and its nearest neighbours; return the ids touched."""
+        centers = self.centers
+        order = np.argsort(((centers - centers[cluster_id]) ** 2).sum(axis=1), kind='stable')
+        
+        # Grow the group until its employees fit in its clusters
+        size = min(len(order), 1 + self.config.INCREMENTAL_REPAIR_NEIGHBORS)
+        while True:
+            group = [int(i) for i in order[:size]]
+            members = [emp for i in group for emp in by_id[i].employees]
+            if len(members) <= size * max_size or size == len(order):
+                break
+            size += 1
+        
+        xy = self.projection.to_meters(coordinates_of(members))
+        clusterer = BalancedKMeansClusterer(
+            n_clusters=len(group),
+            capacity=max(max_size, math.ceil(len(members) / len(group))),
+            random_state=0
+        ).fit(xy)
+        
+        # Keep ids stable: each new cluster takes the old id with the closest center
+        cost = ((clusterer.cluster_centers_[:, None, :] - centers[group][None, :, :]) ** 2).sum(axis=2)
+        rows, cols = linear_sum_assignment(cost)
+        for new, old in zip(rows, cols):
+            cluster = by_id[group[old]]
+            cluster.replace_employees([members[i] for i in np.flatnonzero(clusterer.labels_ == new)])
+            centers[group[old]] = clusterer.cluster_centers_[new]
+            cluster.center = tuple(self.projection.to_latlon(clusterer.cluster_centers_[new])[0])
+        
+        return group
+    
+    def find_optimal_clusters(self, employees, max_clusters=15, min_clusters=1, criterion=None,
+                              vehicle_capacity=None, sample_size=None, max_workers=None):
+        """
+        Find the number of clusters with a parallel k search.
+        
+        Args:
+            employees: EmployeeTable or list of Employee objects
+            max_clusters, min_clusters: Range of k values to try
+            criterion: 'elbow' or 'silhouette' (defaults to config.K_SELECTION_CRITERION)
+            vehicle_capacity: Optional seats per vehicle; k never drops below
+                the number of vehicles needed to carry every employee
+            sample_size: Employees sampled for fitting (defaults to config)
+            max_workers: Worker processes (defaults to the CPU count)
+        
+        Returns:
+            Dict with the chosen 'k', the inertia/silhouette curve and timings
+        """
+        coordinates = self.projection.to_meters(coordinates_of(employees))
+        min_k = math.ceil(len(coordinates) / vehicle_capacity) if vehicle_capacity else None
+        
+        return select_k(
+            coordinates,
+            k_min=min_clusters,
+            k_max=max_clusters,
+            criterion=criterion or self.config.K_SELECTION_CRITERION,
+            min_k=min_k,
+            sample_size=sample_size or self.config.K_SELECTION_SAMPLE_SIZE,
+            max_workers=max_workers
+        )
+    
+    def get_convergence_report(self, employees, num_clusters, random_state=None):
+        """
+        Compare mini-batch clustering with full KMeans on the same employees.
+        
+        Returns:
+            Dict with both inertias, their relative gap and fit times
+        """
+        demand = aggregate_points(coordinates_of(employees), self.config.DEMAND_AGGREGATION_RADIUS, self.projection)
+        clusterer = MiniBatchKMeansClusterer(
+            n_clusters=num_clusters,
+            random_state=random_state,
+            batch_size=self.config.MINIBATCH_SIZE
+        )
+        return clusterer.convergence_report(self.projection.to_meters(demand.coords), sample_weight=demand.weights)
     
     def get_clustering_stats(self):
         """Return clustering statistics."""
@@ -1,6 +1,13 @@
-"""Location Service - handles employee location generation and transit stops."""
+"""Location Service - handles employee location generation, ingestion and transit stops."""
+import os
+
+import numpy as np
+import pandas as pd
+
 from utils.data_generator import DataGenerator
-from core.employee import Employee
+from utils.geo import service_bounding_box, LocalProjection
+from utils.stop_index import StopIndex
+from core.employee_table import EmployeeTable, coordinates_of
 
 
 class LocationService:
@@ -9,7 +16,14 @@ class LocationService:
     def __init__(self, config):
         self.config = config
         self.office_location = config.OFFICE_LOCATION
-        self.data_generator = DataGenerator()
+        self.projection = LocalProjection(*config.OFFICE_LOCATION)
+        self.bounding_box = service_bounding_box(self.office_location, config.SERVICE_RADIUS)
+        self.data_generator = DataGenerator(
+            osm_file=config.OSM_FILE,
+            bundle_dir=config.REGION_BUNDLE_DIR,
+            bounding_box=self.bounding_box
+        )
+        self._stop_index = None
     
     def generate_employees(self, count, seed=None):
         """
@@ -20,31 +34,183 @@ class LocationService:
             seed: Random seed for reproducibility
         
         Returns:
-            List of Employee objects
+            EmployeeTable (iterates as Employee objects)
         """
         df = self.data_generator.generate(n=count, seed=seed)
-        employees = []
-        for _, row in df.iterrows():
-            employee = Employee(
-                id=int(row['id']),
-                lat=row['lat'],
-                lon=row['lon'],
-                name=f"Employee {int(row['id'])}"
+        return EmployeeTable.from_dataframe(df)
+    
+    def _iter_chunks(self, path, columns, chunk_size):
+        """Yield dicts of column arrays from a CSV or Parquet file, chunk by chunk."""
+        extension = os.path.splitext(path)[1].lower()
+        
+        if extension in ('.parquet', '.pq'):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("pyarrow is required to read Parquet files")
+            
+            parquet_file = pq.ParquetFile(path)
+            available = set(parquet_file.schema_arrow.names)
+            columns = [col for col in columns if col in available]
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+                yield {col: batch.column(col).to_numpy(zero_copy_only=False) for col in columns}
+        
+        elif extension == '.npy':
+            # Structured arrays such as PopulationGenerator output
+            data = np.load(path, mmap_mode='r')
+            columns = [col for col in columns if col in (data.dtype.names or ())]
+            for start in range(0, len(data), chunk_size):
+                chunk = data[start:start + chunk_size]
+                yield {col: np.asarray(chunk[col]) for col in columns}
+        
+        elif extension in ('.csv', '.txt', '.gz'):
+            header = pd.read_csv(path, nrows=0).columns
+            columns = [col for col in columns if col in header]
+            for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size):
+                yield {col: chunk[col].to_numpy() for col in columns}
+        
+        else:
+            raise ValueError(f"Unsupported employee file format: {path}")
+    
+    def load_employees(self, path, id_col='id', lat_col='lat', lon_col='lon', name_col=None,
+                       chunk_size=None, bounding_box=None):
+        """
+        Load employees from a CSV or Parquet file in chunks.
+        
+        Each chunk is validated and filtered to the service region with array
+        operations, and only the surviving columns are kept, so memory stays
+        proportional to the accepted employees rather than the file.
+        Duplicate ids keep their first row; files without an id column are
+        deduplicated on coordinates instead and numbered from 1.
+        
+        Args:
+            path: Path to a .csv, .parquet or structured .npy file
+            id_col, lat_col, lon_col: Column names
+            name_col: Optional column with display names
+            chunk_size: Rows per chunk (defaults to config.INGEST_CHUNK_SIZE)
+            bounding_box: [minx, miny, maxx, maxy] to keep; defaults to the
+                service area (no filter when SERVICE_RADIUS is None)
+        
+        Returns:
+            EmployeeTable (iterates as Employee objects)
+        """
+        chunk_size = chunk_size or self.config.INGEST_CHUNK_SIZE
+        bounding_box = bounding_box if bounding_box is not None else self.bounding_box
+        columns = [col for col in (id_col, lat_col, lon_col, name_col) if col]
+        
+        parts = {'ids': [], 'lat': [], 'lon': [], 'names': []}
+        total = invalid = outside = 0
+        has_ids = has_names = False
+        
+        for chunk in self._iter_chunks(path, columns, chunk_size):
+            if lat_col not in chunk or lon_col not in chunk:
+                raise ValueError(f"Employee file must have '{lat_col}' and '{lon_col}' columns")
+            
+            lat = pd.to_numeric(chunk[lat_col], errors='coerce').astype(np.float64)
+            lon = pd.to_numeric(chunk[lon_col], errors='coerce').astype(np.float64)
+            total += len(lat)
+            
+            valid = (
+                np.isfinite(lat) & np.isfinite(lon)
+                & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+                & ~((lat == 0) & (lon == 0))
             )
-            employees.append(employee)
+            invalid += int(np.count_nonzero(~valid))
+            
+            keep = valid
+            if bounding_box is not None:
+                minx, miny, maxx, maxy = bounding_box
+                inside = (lon >= minx) & (lon <= maxx) & (lat >= miny) & (lat <= maxy)
+                outside += int(np.count_nonzero(valid & ~inside))
+                keep = valid & inside
+            
+            parts['lat'].append(lat[keep])
+            parts['lon'].append(lon[keep])
+            if id_col in chunk:
+                has_ids = True
+                parts['ids'].append(np.asarray(chunk[id_col])[keep])
+            if name_col and name_col in chunk:
+                has_names = True
+                parts['names'].append(np.asarray(chunk[name_col], dtype=object)[keep])
+        
+        lat = np.concatenate(parts['lat']) if parts['lat'] else np.empty(0)
+        lon = np.concatenate(parts['lon']) if parts['lon'] else np.empty(0)
+        ids = np.concatenate(parts['ids']) if has_ids else np.arange(1, len(lat) + 1)
+        names = np.concatenate(parts['names']) if has_names else None
         
-        return employees
+        # np.unique returns the first occurrence of each key; sorting those
+        # positions restores file order
+        if has_ids:
+            _, first = np.unique(ids, return_index=True)
+        else:
+            _, first = np.unique(np.column_stack([lat, lon]), axis=0, return_index=True)
+        first = np.sort(first)
+        duplicates = len(lat) - len(first)
+        
+        lat, lon, ids = lat[first], lon[first], ids[first]
+        if names is not None:
+            names = names[first]
+        if not has_ids:
+            ids = np.arange(1, len(lat) + 1)
+        
+        print(f"    Loaded {len(lat)} of {total} rows from {path} "
+              f"({invalid} invalid, {outside} outside service area, {duplicates} duplicates)")
+        
+        return EmployeeTable(ids, lat, lon, names=names)
     
     def get_transit_stops(self):
-        """Get list of transit stops from OSM data."""
+        """Get transit stops from OSM data as an (n, 2) [lat, lon] array."""
         return self.data_generator.get_transit_stops()
     
+    def get_stop_index(self):
+        """Get a spatial index over the transit stops, built once per service."""
+        if self._stop_index is None:
+            self._stop_index = StopIndex(self.get_transit_stops())
+        return self._stop_index
+    
+    def get_service_area(self, employees=None):
+        """
+        Get the region of interest for the office.
+        
+        Covers SERVICE_RADIUS around the office and, when given, every
+        employee plus the maximum walking distance.
+        
+        Returns:
+            [minx, miny, maxx, maxy], or None for the whole pbf
+        """
+        points = coordinates_of(employees) if employees is not None else None
+        return service_bounding_box(
+            self.office_location,
+            self.config.SERVICE_RADIUS,
+            points=points,
+            margin_m=self.config.MAX_WALK_DISTANCE
+        )
+    
+    def set_service_area(self, employees):
+        """
+        Limit OSM parsing to the area around the office and the given employees.
+        
+        Only takes effect before the pbf is parsed; once the residential area
+        and stops are loaded, the area already in use is kept.
+        
+        Returns:
+            The bounding box in use
+        """
+        if not self.data_generator.is_loaded():
+            self.bounding_box = self.get_service_area(employees)
+            self.data_generator.bounding_box = self.bounding_box
+        return self.bounding_box
+    
     def get_office_location(self):
         """Return the office location tuple."""
         return self.office_location
     
     def is_within_bounds(self, employee, max_distance_from_center):
         """Check if employee is within acceptable distance from office."""
+        return bool(self.get_within_bounds_mask([employee], max_distance_from_center)[0])
+    
+    def get_within_bounds_mask(self, employees, max_distance_from_center):
+        """Return a boolean array marking employees within the distance from office."""
         office_lat, office_lon = self.office_location
-        distance = employee.distance_to(office_lat, office_lon)
-        return distance <= max_distance_from_center
+        distances = self.projection.distances_to_point(coordinates_of(employees), office_lat, office_lon)
+        return distances <= max_distance_from_center
@@ -1,9 +1,11 @@
 """Service Planner - main orchestrator for route optimization."""
+import numpy as np
 from services.location import LocationService
 from services.clustering import ClusteringService
 from services.routing import RoutingService
 from services.visualization import VisualizationService
 from core.vehicle import Vehicle
+from core.employee_table import EmployeeTable
 from datetime import datetime, timedelta
 
 
@@ -26,7 +28,7 @@ class ServicePlanner:
         
         # State
         self.stats = {}
-        self.safe_stops = []
+        self.safe_stops = None
     
     @staticmethod
     def get_departure_time():
@@ -47,8 +49,33 @@ class ServicePlanner:
         
         return self.employees
     
+    def load_employees(self, path=None):
+        """Load employee locations from a CSV or Parquet roster."""
+        path = path or self.config.EMPLOYEE_FILE
+        
+        print(f"[1] Loading employee locations from {path}...")
+        self.employees = self.location_service.load_employees(path)
+        print(f"    OK: {len(self.employees)} employees loaded")
+        
+        # Parse only the part of the pbf the roster needs
+        area = self.location_service.set_service_area(self.employees)
+        self.routing_service.set_bounding_box(area)
+        
+        return self.employees
+    
     def create_clusters(self, num_clusters=None):
         """Cluster employees into groups."""
+        if num_clusters is None and self.config.AUTO_NUM_CLUSTERS:
+            print(f"[2] Selecting cluster count...")
+            selection = self.clustering_service.find_optimal_clusters(
+                self.employees,
+                max_clusters=self.config.MAX_CLUSTERS,
+                vehicle_capacity=self.config.VEHICLE_CAPACITY
+            )
+            num_clusters = selection['k']
+            print(f"    OK: k={num_clusters} by {selection['criterion']} "
+                  f"({len(selection['ks'])} candidates, {selection['workers']} workers, {selection['seconds']}s)")
+        
         num_clusters = num_clusters or self.config.NUM_CLUSTERS
         
         print(f"[2] Creating {num_clusters} clusters...")
@@ -61,8 +88,46 @@ class ServicePlanner:
         
         return self.clusters
     
-    def filter_employees_by_distance(self):
-        """Filter out employees too far from cluster centers."""
+    def update_roster(self, added=(), removed=(), reroute=True):
+        """
+        Apply hires, departures and address changes without re-clustering everyone.
+        
+        Only clusters whose employees changed get their stops and routes rebuilt.
+        """
+        added, removed = list(added), list(removed)
+        print(f"[2] Updating clusters (+{len(added)} / -{len(removed)} employees)...")
+        
+        if isinstance(self.employees, EmployeeTable):
+            # New hires become rows of the roster table so clusters stay table-backed
+            if added:
+                rows = self.employees.append(
+                    [emp.id for emp in added],
+                    [emp.lat for emp in added],
+                    [emp.lon for emp in added],
+                    names=[emp.raw_name for emp in added]
+                )
+                added = self.employees.views(rows)
+            report = self.clustering_service.update_clusters(self.clusters, added=added, removed=removed)
+            self.employees.remove(self.employees.rows_of(removed))
+        else:
+            report = self.clustering_service.update_clusters(self.clusters, added=added, removed=removed)
+            gone = {id(employee) for employee in removed}
+            self.employees = [emp for emp in self.employees if id(emp) not in gone] + added
+        
+        print(f"    OK: {len(report['changed'])} clusters changed, {len(report['repaired'])} re-clustered")
+        
+        if reroute and report['changed']:
+            changed_ids = set(report['changed'])
+            changed = [cluster for cluster in self.clusters if cluster.id in changed_ids]
+            self.filter_employees_by_distance(changed)
+            self.generate_stops(changed)
+            self.optimize_routes(use_stops=True, clusters=changed)
+        
+        return report
+    
+    def filter_employees_by_distance(self, clusters=None):
+        """Filter out employees too far from cluster centers (all clusters by default)."""
+        clusters = self.clusters if clusters is None else clusters
         max_distance = self.config.MAX_DISTANCE_FROM_CENTER
         
         if max_distance is None:
@@ -72,36 +137,34 @@ class ServicePlanner:
         total_excluded = 0
         
         print(f"[3] Filtering distant employees (max: {max_distance/1000}km)...")
-        for cluster in self.clusters:
-            excluded = cluster.filter_by_distance(max_distance)
+        for cluster in clusters:
+            excluded = cluster.filter_by_distance(max_distance, self.clustering_service.projection)
             total_excluded += excluded
         
         print(f"    OK: {total_excluded} employees excluded")
         
         return total_excluded
     
-    def generate_stops(self):
-        """Generate pickup stops for each cluster."""
+    def generate_stops(self, clusters=None):
+        """Generate pickup stops for each cluster (all clusters by default)."""
+        clusters = self.clusters if clusters is None else clusters
         print(f"[4] Finding farthest employees from office in each cluster...")
         
         office_lat, office_lon = self.config.OFFICE_LOCATION
+        projection = self.clustering_service.projection
         total_routes = 0
         
-        for cluster in self.clusters:
+        for cluster in clusters:
             active_employees = cluster.get_active_employees()
             
             if len(active_employees) == 0:
                 continue
             
             # Find farthest employee from office
-            max_distance = 0
-            farthest_employee = None
-            
-            for employee in active_employees:
-                distance = employee.distance_to(office_lat, office_lon)
-                if distance > max_distance:
-                    max_distance = distance
-                    farthest_employee = employee
+            distances = projection.distances_to_point(cluster.get_employee_coordinates(), office_lat, office_lon)
+            farthest = int(np.argmax(distances))
+            max_distance = float(distances[farthest])
+            farthest_employee = active_employees[farthest] if max_distance > 0 else None
             
             if farthest_employee:
                 cluster_center = cluster.center
@@ -125,29 +188,24 @@ class ServicePlanner:
         
         return {'total_routes': total_routes}
     
-    def optimize_routes(self, use_stops=True):
-        """Optimize routes for all clusters using OSRM."""
+    def optimize_routes(self, use_stops=True, clusters=None):
+        """Optimize routes for all clusters (or the given ones) using the configured routing engine."""
+        clusters = self.clusters if clusters is None else clusters
         mode = "stops" if use_stops else "employee locations"
         print(f"[5] Creating routes ({mode})...")
         
-        routes = []
-        
-        for cluster in self.clusters:
-            route = self.routing_service.optimize_cluster_route(
-                cluster=cluster,
-                use_stops=use_stops
-            )
-            if route:
-                routes.append(route)
+        # Route clusters and match their employees concurrently
+        routes = self.routing_service.optimize_all_clusters(
+            clusters,
+            use_stops=use_stops,
+            match_employees=True,
+            safe_stops=self.safe_stops
+        )
         
-        # Match employees to routes
-        for i, cluster in enumerate(self.clusters):
-            if cluster.route:
-                print(f"   Matching employees to route for cluster {cluster.id}...")
-                matched = cluster.route.match_employees_to_route(cluster.employees, safe_stops=self.safe_stops)
-                print(f"   Matched {matched} employees to route points")
-
+        for cluster in clusters:
             if cluster.route:
+                print(f"   Cluster {cluster.id}: matched {cluster.route.matched_count} employees to route points")
+                
                 active = cluster.get_employee_count(include_excluded=False)
                 if use_stops and cluster.has_stops():
                     n_stops = len(cluster.stops)
@@ -168,7 +226,7 @@ class ServicePlanner:
         for i, cluster in enumerate(self.clusters):
             vehicle = Vehicle(
                 id=i + 1,
-                capacity=50,
+                capacity=self.config.VEHICLE_CAPACITY,
                 vehicle_type="Minibus"
             )
             vehicle.assign_cluster(cluster)
@@ -245,11 +303,15 @@ class ServicePlanner:
         print(f"   Config: {self.config.NUM_EMPLOYEES} employees, {self.config.NUM_CLUSTERS} clusters")
         print("=" * 50 + "\n")
         
+        # Employees come first so a loaded roster can limit the OSM parse
+        if self.config.EMPLOYEE_FILE:
+            self.load_employees()
+        else:
+            self.generate_employees()
+        
         print("[0] Loading Safe Pickup Points (Bus/Metro Stops)...")
-        self.safe_stops = self.location_service.get_transit_stops()
+        self.safe_stops = self.location_service.get_stop_index()
         print(f"    OK: {len(self.safe_stops)} safe stops loaded from OSM")
-        
-        self.generate_employees()
         self.create_clusters()
         self.filter_employees_by_distance()
         self.generate_stops()
@@ -1,33 +1,96 @@
-"""Routing Service - handles route optimization for clusters using OSRM."""
+"""Routing Service - handles route optimization for clusters using OSRM or a local engine."""
+from concurrent.futures import ThreadPoolExecutor
+
 from routing_engines.osrm import OSRMRouter
+from routing_engines.local import LocalRouter
+from routing_engines.cache import APICache
+from routing_engines.transport import HTTPTransport
 from core.route import Route
+from utils.geo import service_bounding_box
+from utils.stop_index import StopIndex
 
 
 class RoutingService:
-    """Service for optimizing vehicle routes using OSRM."""
+    """Service for optimizing vehicle routes using the configured routing engine."""
     
     def __init__(self, config):
         self.config = config
         self.office_location = config.OFFICE_LOCATION
-        self.osrm_router = OSRMRouter()
+        self.router = self._create_router(config, config.ROUTING_ENGINE)
+        
+        # Walking matrices may come from a different engine than vehicle routes
+        matrix_engine = config.MATRIX_ENGINE or config.ROUTING_ENGINE
+        if matrix_engine == config.ROUTING_ENGINE:
+            self.matrix_router = self.router
+        else:
+            self.matrix_router = self._create_router(config, matrix_engine)
+    
+    def _create_router(self, config, engine):
+        """Create a routing engine ('osrm' or 'local')."""
+        if engine == 'local':
+            return LocalRouter(
+                osm_file=config.OSM_FILE,
+                bounding_box=service_bounding_box(config.OFFICE_LOCATION, config.SERVICE_RADIUS),
+                matrix_limit=config.MATRIX_DISTANCE_LIMIT,
+                walking_limit=config.MATRIX_WALK_LIMIT,
+                bundle_dir=config.REGION_BUNDLE_DIR
+            )
+        
+        if engine != 'osrm':
+            raise ValueError(f"Unsupported routing engine: {engine}")
+        
+        return OSRMRouter(
+            base_url=config.OSRM_BASE_URL,
+            cache=self._create_cache(config),
+            max_table_size=config.OSRM_MAX_TABLE_SIZE,
+            max_parallel_tiles=config.OSRM_PARALLEL_TILES,
+            transport=HTTPTransport(
+                pool_size=config.HTTP_POOL_SIZE,
+                max_retries=config.HTTP_MAX_RETRIES,
+                backoff_factor=config.HTTP_BACKOFF_FACTOR,
+                timeout=config.HTTP_TIMEOUT
+            )
+        )
+    
+    def set_bounding_box(self, bounding_box):
+        """Limit offline road-network parsing to a region of interest."""
+        for router in (self.router, self.matrix_router):
+            if isinstance(router, LocalRouter):
+                router.set_bounding_box(bounding_box)
+    
+    @staticmethod
+    def _create_cache(config):
+        """Create the bounded OSRM response cache from config limits."""
+        return APICache(
+            cache_file='data/osrm_cache.db',
+            legacy_file='data/osrm_cache.json',
+            max_entries=config.CACHE_MAX_ENTRIES,
+            max_bytes=config.CACHE_MAX_BYTES,
+            ttl=config.CACHE_TTL_SECONDS,
+            memory_max_entries=config.CACHE_MEMORY_MAX_ENTRIES,
+            memory_max_bytes=config.CACHE_MEMORY_MAX_BYTES,
+            quantize_meters=config.CACHE_QUANTIZE_METERS,
+            near_hit_meters=config.CACHE_NEAR_HIT_METERS
+        )
     
-    def optimize_cluster_route(self, cluster, use_stops=True):
+    def optimize_cluster_route(self, cluster, use_stops=True, log=print):
         """
-        Optimize route for a single cluster using OSRM.
+        Optimize route for a single cluster using the routing engine.
         
         Args:
             cluster: Cluster object to route
             use_stops: Whether to use predetermined stops
+            log: Callable receiving progress messages
         
         Returns:
             Route object or None if no route possible
         """
         if use_stops and cluster.has_stops():
             route_stops = cluster.stops
-            print(f"   Using {len(route_stops)} predetermined stops for cluster {cluster.id}")
+            log(f"   Using {len(route_stops)} predetermined stops for cluster {cluster.id}")
         else:
             route_stops = cluster.get_employee_locations(include_excluded=False)
-            print(f"   Using {len(route_stops)} employee locations for cluster {cluster.id}")
+            log(f"   Using {len(route_stops)} employee locations for cluster {cluster.id}")
         
         if len(route_stops) == 0:
             return None
@@ -36,25 +99,92 @@ class RoutingService:
         route.set_stops(route_stops)
         
         try:
-            osrm_data = self.osrm_router.get_route(route_stops)
-            route.coordinates = osrm_data['coordinates']
-            route.distance_km = osrm_data['distance_km']
-            route.duration_min = osrm_data['duration_min']
-            print(f"   OK: OSRM route: {route.distance_km:.1f}km, {route.duration_min:.1f}min")
+            route_data = self.router.get_route(route_stops, log=log)
+            route.set_coordinates(route_data['coordinates'])
+            route.distance_km = route_data['distance_km']
+            route.duration_min = route_data['duration_min']
+            log(f"   OK: {self.config.ROUTING_ENGINE} route: {route.distance_km:.1f}km, {route.duration_min:.1f}min")
         except Exception as e:
-            print(f"   ERROR: OSRM failed: {e}")
+            log(f"   ERROR: {self.config.ROUTING_ENGINE} routing failed: {e}")
             route.calculate_stats_from_stops()
         
         cluster.assign_route(route)
         
         return route
     
-    def optimize_all_clusters(self, clusters):
-        """Optimize routes for all clusters using OSRM."""
-        routes = []
+    def match_cluster_employees(self, cluster, safe_stops=None, log=print):
+        """
+        Match a cluster's employees to pickup points along its route.
+        
+        Args:
+            cluster: Cluster whose route is already optimized
+            safe_stops: Transit stops usable as pickup points
+            log: Callable receiving warnings and fallback messages
         
-        for cluster in clusters:
-            route = self.optimize_cluster_route(cluster=cluster)
+        Returns:
+            Number of matched employees
+        """
+        if not cluster.route:
+            return 0
+        
+        return cluster.route.match_employees_to_route(
+            cluster.employees,
+            safe_stops=safe_stops,
+            router=self.matrix_router,
+            aggregate_radius=self.config.DEMAND_AGGREGATION_RADIUS,
+            log=log
+        )
+    
+    def _route_cluster(self, cluster, use_stops, match_employees, safe_stops):
+        """Route a single cluster and optionally match its employees; return (route, messages)."""
+        messages = []
+        route = self.optimize_cluster_route(cluster=cluster, use_stops=use_stops, log=messages.append)
+        if route and match_employees:
+            route.matched_count = self.match_cluster_employees(
+                cluster, safe_stops=safe_stops, log=messages.append
+            )
+        return route, messages
+    
+    def optimize_all_clusters(self, clusters, use_stops=True, match_employees=False,
+                              safe_stops=None, max_workers=None):
+        """
+        Optimize routes for all clusters.
+        
+        Clusters are independent, so with `max_workers` > 1 each cluster's route
+        request and its follow-up matching run on a bounded thread pool. Results
+        and progress messages are collected in cluster order, so the output
+        matches the sequential path. Matched employee counts are stored on
+        each route as `matched_count`.
+        
+        Args:
+            clusters: List of Cluster objects
+            use_stops: Whether to use predetermined stops
+            match_employees: Also match employees to pickup points on each route
+            safe_stops: Transit stops used for matching (StopIndex or [lat, lon] array)
+            max_workers: Concurrency limit (defaults to config.ROUTING_CONCURRENCY)
+        
+        Returns:
+            List of Route objects
+        """
+        max_workers = max_workers or self.config.ROUTING_CONCURRENCY
+        
+        # One index shared by every cluster instead of one per route
+        if safe_stops is not None and not isinstance(safe_stops, StopIndex):
+            safe_stops = StopIndex(safe_stops)
+        
+        def task(cluster):
+            return self._route_cluster(cluster, use_stops, match_employees, safe_stops)
+        
+        if max_workers <= 1 or len(clusters) <= 1:
+            results = [task(cluster) for cluster in clusters]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(clusters))) as executor:
+                results = list(executor.map(task, clusters))
+        
+        routes = []
+        for route, messages in results:
+            for message in messages:
+                print(message)
             if route:
                 routes.append(route)
         
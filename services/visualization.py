@@ -1,5 +1,7 @@
 """Visualization Service - generates HTML maps for routes and clusters."""
 import folium
+import numpy as np
+from utils.geo import haversine_vector
 
 
 class VisualizationService:
@@ -134,7 +136,7 @@ class VisualizationService:
             # Draw route polyline
             if route.coordinates:
                 folium.PolyLine(
-                    route.coordinates,
+                    route.coordinates.to_list(),
                     color=color,
                     weight=4,
                     opacity=0.7,
@@ -216,6 +218,22 @@ class VisualizationService:
             icon=folium.Icon(color='black', icon='star', prefix='fa')
         ).add_to(m)
         
+        # Pick-up targets and walking distances for all employees at once
+        targets = {}
+        for employee in cluster.employees:
+            if not employee.excluded:
+                stop_index, stop_location = cluster.get_employee_stop(employee)
+                target_location = employee.pickup_point if hasattr(employee, 'pickup_point') and employee.pickup_point else stop_location
+                targets[employee.id] = (stop_index, target_location)
+        
+        walkers = [emp for emp in cluster.employees if not emp.excluded and targets[emp.id][1]]
+        walk_distances = {}
+        if walkers:
+            origins = np.array([emp.get_location() for emp in walkers])
+            destinations = np.array([targets[emp.id][1] for emp in walkers], dtype=np.float64)
+            distances = haversine_vector(origins[:, 0], origins[:, 1], destinations[:, 0], destinations[:, 1])
+            walk_distances = dict(zip((emp.id for emp in walkers), distances))
+        
         # Employees with pickup lines
         for employee in cluster.employees:
             if employee.excluded:
@@ -232,11 +250,10 @@ class VisualizationService:
                     weight=1
                 ).add_to(m)
             else:
-                stop_index, stop_location = cluster.get_employee_stop(employee)
-                target_location = employee.pickup_point if hasattr(employee, 'pickup_point') and employee.pickup_point else stop_location
+                stop_index, target_location = targets[employee.id]
                 
                 if target_location:
-                    walk_distance = employee.distance_to(target_location[0], target_location[1])
+                    walk_distance = walk_distances[employee.id]
                     
                     # Draw walking line
                     folium.PolyLine(
@@ -295,7 +312,7 @@ class VisualizationService:
         # Route polyline
         if cluster.route and cluster.route.coordinates:
             folium.PolyLine(
-                cluster.route.coordinates,
+                cluster.route.coordinates.to_list(),
                 color=color,
                 weight=5,
                 opacity=0.8,
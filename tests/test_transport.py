@@ -0,0 +1,89 @@
+"""HTTPTransport against a local stub HTTP server."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from routing_engines.transport import HTTPTransport
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers with the queued (status, headers) replies, then 200 with a JSON body."""
+
+    def do_GET(self):
+        server = self.server
+        server.hits += 1
+        status, headers = server.replies.pop(0) if server.replies else (200, {})
+
+        body = json.dumps({'hit': server.hits}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.replies = []
+    server.hits = 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url_of(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/route"
+
+
+def test_retries_on_503_until_success(stub_server):
+    stub_server.replies = [(503, {}), (503, {})]
+    transport = HTTPTransport(max_retries=3, backoff_factor=0.001)
+
+    assert transport.get_json(url_of(stub_server)) == {'hit': 3}
+    assert stub_server.hits == 3
+
+
+def test_gives_up_after_max_retries(stub_server):
+    stub_server.replies = [(503, {})] * 5
+    transport = HTTPTransport(max_retries=2, backoff_factor=0.001)
+
+    with pytest.raises(requests.HTTPError):
+        transport.get(url_of(stub_server))
+    assert stub_server.hits == 3
+
+
+def test_honours_retry_after(stub_server):
+    stub_server.replies = [(503, {'Retry-After': '0.3'})]
+    transport = HTTPTransport(max_retries=1, backoff_factor=0.001)
+
+    start = time.perf_counter()
+    transport.get(url_of(stub_server))
+
+    assert time.perf_counter() - start >= 0.3
+    assert stub_server.hits == 2
+
+
+def test_metrics_count_requests_errors_and_retries(stub_server):
+    stub_server.replies = [(503, {}), (429, {})]
+    transport = HTTPTransport(max_retries=3, backoff_factor=0.001)
+
+    transport.get(url_of(stub_server))
+    transport.get(url_of(stub_server))
+    metrics = transport.get_metrics()
+
+    assert metrics['requests'] == 4
+    assert metrics['errors'] == 2
+    assert metrics['retries'] == 2
+    assert metrics['max_ms'] >= metrics['p50_ms'] > 0
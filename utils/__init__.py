@@ -1,6 +1,18 @@
 # Utility functions
-from utils.geo import haversine
+from utils.geo import (
+    haversine, haversine_vector, distances_to_point, pairwise_distances, polyline_length,
+    equirectangular, bounding_box_around, service_bounding_box, LocalProjection
+)
 from utils.data_generator import DataGenerator
-from utils.kmeans import KMeansClusterer
+from utils.kmeans import KMeansClusterer, MiniBatchKMeansClusterer, BalancedKMeansClusterer
+from utils.stop_index import StopIndex
+from utils.population import PopulationGenerator
+from utils.aggregation import aggregate_points, DemandPoints
 
-__all__ = ['haversine', 'DataGenerator', 'KMeansClusterer']
+__all__ = [
+    'haversine', 'haversine_vector', 'distances_to_point', 'pairwise_distances', 'polyline_length',
+    'equirectangular', 'bounding_box_around', 'service_bounding_box', 'LocalProjection',
+    'DataGenerator', 'KMeansClusterer', 'MiniBatchKMeansClusterer', 'BalancedKMeansClusterer',
+    'StopIndex', 'PopulationGenerator',
+    'aggregate_points', 'DemandPoints',
+]
@@ -0,0 +1,70 @@
+"""Demand aggregation - merges co-located employees into weighted demand points."""
+import math
+
+import numpy as np
+
+from utils.geo import LocalProjection
+
+
+class DemandPoints:
+    """
+    Weighted demand points and the mapping back to the original points.
+    
+    Attributes:
+        coords: (m, 2) [lat, lon] centroid of each demand point
+        weights: (m,) number of original points merged into each
+        inverse: (n,) demand point index of every original point
+    """
+    
+    def __init__(self, coords, weights, inverse):
+        self.coords = coords
+        self.weights = weights
+        self.inverse = inverse
+    
+    def __len__(self):
+        return len(self.coords)
+    
+    def expand(self, values):
+        """Map per-demand-point values (rows) back to the original points."""
+        return np.asarray(values)[self.inverse]
+    
+    def __repr__(self):
+        return f"DemandPoints(points={len(self.coords)}, employees={len(self.inverse)})"
+
+
+def aggregate_points(coords, radius_m=None, projection=None):
+    """
+    Merge points that fall in the same grid cell into weighted demand points.
+    
+    Cells are radius_m / sqrt(2) wide, so any two merged points are at most
+    radius_m apart. Each demand point sits at the mean of its members.
+    
+    Args:
+        coords: Array-like of shape (n, 2) with [lat, lon] rows
+        radius_m: Merge radius in meters; None or 0 keeps every point
+        projection: Optional LocalProjection for the grid; defaults to one
+            around the mean of coords
+    
+    Returns:
+        DemandPoints
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    n = len(coords)
+    
+    if not radius_m or n == 0:
+        return DemandPoints(coords, np.ones(n), np.arange(n))
+    
+    cell_m = radius_m / math.sqrt(2)
+    projection = projection or LocalProjection.around(coords)
+    cells = np.floor(projection.to_meters(coords) / cell_m).astype(np.int64)
+    
+    _, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    
+    weights = np.bincount(inverse).astype(np.float64)
+    centroids = np.column_stack([
+        np.bincount(inverse, weights=coords[:, 0]),
+        np.bincount(inverse, weights=coords[:, 1]),
+    ]) / weights[:, None]
+    
+    return DemandPoints(centroids, weights, inverse)
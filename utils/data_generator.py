@@ -1,79 +1,105 @@
 """Data Generator - generates synthetic employee locations from OSM data."""
 import numpy as np
 import pandas as pd
+import shapely
 from shapely.geometry import Point
 import folium
 from pyrosm import OSM
 
+from utils.region_bundle import RegionBundle, parse_residential_area, parse_transit_stops
+
 
 class DataGenerator:
     """Generates employee locations within urban residential areas."""
     
-    def __init__(self, osm_file="data/istanbul-center.osm.pbf"):
+    SAMPLING_MODES = ('batched', 'loop', 'triangulated')
+    
+    def __init__(self, osm_file="data/istanbul-center.osm.pbf", sampling='batched', density=None,
+                 bundle_dir=None, bounding_box=None):
+        """
+        Args:
+            osm_file: Path to the .osm.pbf file
+            sampling: Default sampling mode ('batched', 'loop' or 'triangulated')
+            density: Optional callable taking a residential polygon and returning
+                its relative population density (triangulated sampling only)
+            bundle_dir: Optional directory of compiled region bundles; when set,
+                the pbf is parsed once and later runs load the bundle instead
+            bounding_box: Optional [minx, miny, maxx, maxy] region of interest;
+                only this part of the pbf is parsed and sampled
+        """
+        if sampling not in self.SAMPLING_MODES:
+            raise ValueError(f"Unsupported sampling mode: {sampling}")
+        
         self.osm_file = osm_file
+        self.sampling = sampling
+        self.density = density
+        self.bundle_dir = bundle_dir
+        self.bounding_box = bounding_box
         self._osm = None
         self._urban_area = None
         self._bounds = None
+        self._stops = None
+        self._triangles = None
+        self._triangle_cdf = None
     
-    def _load_osm_data(self):
-        """Load and cache OSM data."""
-        if self._osm is None:
-            self._osm = OSM(self.osm_file)
-            
-            landuse = self._osm.get_data_by_custom_criteria(
-                custom_filter={"landuse": ["residential"]},
-                filter_type="keep",
-                keep_nodes=False,
-                keep_ways=True,
-                keep_relations=True
-            )
-            
-            self._urban_area = landuse.unary_union
-            self._bounds = landuse.total_bounds
-            
-    def get_transit_stops(self):
-        """Get bus and metro stops from OSM data."""
+    @classmethod
+    def from_area(cls, urban_area, bounds, sampling='batched', density=None):
+        """
+        Create a generator over an already loaded residential area.
+        
+        Args:
+            urban_area: Shapely geometry of the residential area (lon, lat order)
+            bounds: [minx, miny, maxx, maxy] of the area
+        """
+        generator = cls(osm_file=None, sampling=sampling, density=density)
+        generator._urban_area = urban_area
+        generator._bounds = np.asarray(bounds, dtype=np.float64)
+        shapely.prepare(generator._urban_area)
+        return generator
+    
+    def get_urban_area(self):
+        """Return the residential area geometry and its bounds."""
         self._load_osm_data()
+        return self._urban_area, self._bounds
+    
+    def is_loaded(self):
+        """Whether the residential area has been parsed or loaded already."""
+        return self._urban_area is not None
+    
+    def _load_osm_data(self):
+        """Load and cache OSM data, from the region bundle when enabled."""
+        if self._urban_area is not None:
+            return
         
-        custom_filter = {
-            "highway": ["bus_stop"],
-            "railway": ["subway_entrance", "tram_stop"],
-            "public_transport": ["platform", "stop_position"],
-            "amenity": ["bus_station"]
-        }
-        
-        stops = self._osm.get_data_by_custom_criteria(
-            custom_filter=custom_filter,
-            filter_type="keep",
-            keep_nodes=True,
-            keep_ways=False,
-            keep_relations=False
-        )
+        if self.bundle_dir:
+            bundle = RegionBundle(self.osm_file, self.bundle_dir, bounding_box=self.bounding_box).ensure()
+            self._urban_area = bundle.urban_area
+            self._bounds = bundle.bounds
+            self._stops = bundle.stops
+            return
         
-        if stops is None or len(stops) == 0:
-            return []
+        self._osm = OSM(self.osm_file, bounding_box=self.bounding_box)
+        self._urban_area, self._bounds = parse_residential_area(self._osm, bounding_box=self.bounding_box)
+        
+        # Prepared geometries make repeated containment tests much cheaper
+        shapely.prepare(self._urban_area)
             
-        stops_list = []
-        for _, row in stops.iterrows():
-            if hasattr(row.geometry, 'y') and hasattr(row.geometry, 'x'):
-                stops_list.append((row.geometry.y, row.geometry.x))
-                
-        return stops_list
-    
-    def generate(self, n=100, seed=42):
+    def get_transit_stops(self):
         """
-        Generate n random employee locations within residential areas.
-        
-        Args:
-            n: Number of employees to generate
-            seed: Random seed for reproducibility
+        Get bus and metro stops from OSM data.
         
         Returns:
-            DataFrame with id, lat, lon columns
+            float64 array of shape (n, 2) with [lat, lon] rows
         """
         self._load_osm_data()
         
-        rng = np.random.default_rng(seed)
+        if self._stops is None:
+            self._stops = parse_transit_stops(self._osm)
+        
+        return np.asarray(self._stops)
+    
+    def _sample_loop(self, n, rng):
+        """Draw candidates one at a time (original sampler)."""
         points = []
         attempts = 0
         max_attempts = n * 30
@@ -88,10 +114,131 @@ class DataGenerator:
             
             attempts += 1
         
+        return (
+            np.array([p[0] for p in points], dtype=np.float64),
+            np.array([p[1] for p in points], dtype=np.float64)
+        )
+    
+    def _sample_batched(self, n, rng):
+        """
+        Draw candidates in arrays and test them with one vectorized call per batch.
+        
+        The batch size depends only on n, so the same seed always yields the
+        same points.
+        """
+        max_attempts = n * 30
+        batch_size = min(max(1024, 4 * n), 1_000_000)
+        
+        lats, lons = [], []
+        found = 0
+        attempts = 0
+        
+        while found < n and attempts < max_attempts:
+            size = min(batch_size, max_attempts - attempts)
+            lon = rng.uniform(self._bounds[0], self._bounds[2], size)
+            lat = rng.uniform(self._bounds[1], self._bounds[3], size)
+            
+            inside = shapely.contains_xy(self._urban_area, lon, lat)
+            lats.append(lat[inside])
+            lons.append(lon[inside])
+            found += int(inside.sum())
+            attempts += size
+        
+        if not lats:
+            return np.empty(0), np.empty(0)
+        
+        return np.concatenate(lats)[:n], np.concatenate(lons)[:n]
+    
+    def _build_triangulation(self):
+        """
+        Split the residential area into triangles with cumulative area weights.
+        
+        Built once per generator; every later draw is a weighted triangle pick
+        followed by a uniform point inside it.
+        """
+        if self._triangles is not None:
+            return
+        
+        polygons = shapely.get_parts(shapely.make_valid(self._urban_area))
+        polygons = polygons[shapely.get_type_id(polygons) == 3]
+        
+        triangles, owner = shapely.get_parts(
+            shapely.constrained_delaunay_triangles(polygons), return_index=True
+        )
+        
+        # Exterior rings are closed, so the fourth vertex repeats the first
+        vertices = shapely.get_coordinates(shapely.get_exterior_ring(triangles)).reshape(-1, 4, 2)[:, :3]
+        
+        a, b, c = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+        area = 0.5 * np.abs(
+            (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+        )
+        # Degrees of longitude shrink with latitude
+        area *= np.cos(np.radians(vertices[:, :, 1].mean(axis=1)))
+        
+        if self.density is not None:
+            polygon_density = np.array([self.density(polygon) for polygon in polygons], dtype=np.float64)
+            area *= polygon_density[owner]
+        
+        self._triangles = vertices
+        self._triangle_cdf = np.cumsum(area)
+    
+    def _sample_triangulated(self, n, rng):
+        """Draw exactly n points from the triangulated area without rejection."""
+        self._build_triangulation()
+        
+        if n == 0 or len(self._triangles) == 0 or self._triangle_cdf[-1] <= 0:
+            return np.empty(0), np.empty(0)
+        
+        picks = np.searchsorted(self._triangle_cdf, rng.random(n) * self._triangle_cdf[-1], side='right')
+        picks = np.minimum(picks, len(self._triangles) - 1)
+        tri = self._triangles[picks]
+        
+        # Square-root warp keeps the draw uniform over each triangle
+        r1 = np.sqrt(rng.random(n))[:, None]
+        r2 = rng.random(n)[:, None]
+        points = (1 - r1) * tri[:, 0] + r1 * (1 - r2) * tri[:, 1] + r1 * r2 * tri[:, 2]
+        
+        return points[:, 1], points[:, 0]
+    
+    def sample(self, n, rng, sampling=None):
+        """
+        Draw up to n residential points with a given random generator.
+        
+        Returns:
+            Tuple of (lat, lon) arrays
+        """
+        self._load_osm_data()
+        
+        sampling = sampling or self.sampling
+        if sampling == 'batched':
+            return self._sample_batched(n, rng)
+        if sampling == 'loop':
+            return self._sample_loop(n, rng)
+        if sampling == 'triangulated':
+            return self._sample_triangulated(n, rng)
+        raise ValueError(f"Unsupported sampling mode: {sampling}")
+    
+    def generate(self, n=100, seed=42, sampling=None):
+        """
+        Generate n random employee locations within residential areas.
+        
+        Args:
+            n: Number of employees to generate
+            seed: Random seed for reproducibility
+            sampling: 'batched' (vectorized rejection), 'loop' or 'triangulated'
+                (area-weighted, no rejected draws); defaults to self.sampling.
+                Each mode is reproducible for a seed, but they draw different points.
+        
+        Returns:
+            DataFrame with id, lat, lon columns
+        """
+        lat, lon = self.sample(n, np.random.default_rng(seed), sampling=sampling)
+        
         df = pd.DataFrame({
-            "id": np.arange(1, len(points) + 1),
-            "lat": [p[0] for p in points],
-            "lon": [p[1] for p in points],
+            "id": np.arange(1, len(lat) + 1),
+            "lat": lat,
+            "lon": lon,
         })
         
         return df
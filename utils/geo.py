@@ -1,6 +1,11 @@
 """Geo utilities - common geographic calculations."""
 import math
 
+import numpy as np
+
+
+EARTH_RADIUS_M = 6371000
+
 
 def haversine(lat1, lon1, lat2, lon2):
     """
@@ -13,8 +18,6 @@ def haversine(lat1, lon1, lat2, lon2):
     Returns:
         Distance in meters
     """
-    R = 6371000  # Earth's radius in meters
-    
     phi1 = math.radians(lat1)
     phi2 = math.radians(lat2)
     dphi = math.radians(lat2 - lat1)
@@ -24,4 +27,205 @@ def haversine(lat1, lon1, lat2, lon2):
          math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2)
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     
-    return R * c
+    return EARTH_RADIUS_M * c
+
+
+def haversine_vector(lat1, lon1, lat2, lon2):
+    """
+    Vectorized haversine distance; arguments broadcast like NumPy arrays.
+    
+    Args:
+        lat1, lon1: Latitudes and longitudes of the first points in degrees
+        lat2, lon2: Latitudes and longitudes of the second points in degrees
+    
+    Returns:
+        Distances in meters with the broadcast shape of the inputs
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def distances_to_point(points, lat, lon):
+    """
+    Get the distance from each point to a single location.
+    
+    Args:
+        points: Array-like of shape (n, 2) with [lat, lon] rows
+        lat, lon: Target location in degrees
+    
+    Returns:
+        (n,) array of distances in meters
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return haversine_vector(points[:, 0], points[:, 1], lat, lon)
+
+
+def pairwise_distances(points_a, points_b=None):
+    """
+    Get the haversine distance matrix between two point sets.
+    
+    Args:
+        points_a: Array-like of shape (n, 2) with [lat, lon] rows
+        points_b: Array-like of shape (m, 2); defaults to points_a
+    
+    Returns:
+        (n, m) array of distances in meters
+    """
+    a = np.asarray(points_a, dtype=np.float64).reshape(-1, 2)
+    b = a if points_b is None else np.asarray(points_b, dtype=np.float64).reshape(-1, 2)
+    return haversine_vector(a[:, None, 0], a[:, None, 1], b[None, :, 0], b[None, :, 1])
+
+
+def polyline_length(points):
+    """
+    Get the length of a path through points in order.
+    
+    Args:
+        points: Array-like of shape (n, 2) with [lat, lon] rows
+    
+    Returns:
+        Length in meters
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return 0.0
+    return float(haversine_vector(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1]).sum())
+
+
+def equirectangular(lat1, lon1, lat2, lon2, max_error=None):
+    """
+    Fast flat-earth distance around the mean latitude of each pair.
+    
+    Within a city the result is indistinguishable from haversine and much
+    cheaper. With max_error set, pairs whose relative error could exceed it
+    are recomputed with haversine. The bound used,
+    dlon^2 / (4 cos^2(mean lat)) + dlat^2 / 8 in radians, overestimates the
+    true relative error.
+    
+    Args:
+        lat1, lon1, lat2, lon2: Coordinates in degrees (broadcast)
+        max_error: Optional relative error tolerance, e.g. 0.001 for 0.1%
+    
+    Returns:
+        Distances in meters with the broadcast shape of the inputs
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    # Wrap longitude differences across the antimeridian
+    dlambda = (np.radians(np.subtract(lon2, lon1)) + np.pi) % (2 * np.pi) - np.pi
+    cos_mean = np.cos((phi1 + phi2) / 2)
+    
+    distance = EARTH_RADIUS_M * np.hypot(dlambda * cos_mean, dphi)
+    if max_error is None:
+        return distance
+    
+    error_bound = dlambda ** 2 / (4 * np.maximum(cos_mean, 1e-12) ** 2) + dphi ** 2 / 8
+    inexact = error_bound > max_error
+    if not np.any(inexact):
+        return distance
+    
+    exact = haversine_vector(lat1, lon1, lat2, lon2)
+    return np.where(inexact, exact, distance)
+
+
+class LocalProjection:
+    """
+    Local equirectangular projection to planar meters around a reference point.
+    
+    Rows of [lat, lon] degrees become [x, y] meters east and north of the
+    reference, so clustering and distance checks can use plain Euclidean
+    math. Within a city the scale error stays well below 1%.
+    """
+    
+    METERS_PER_DEGREE = math.radians(1) * EARTH_RADIUS_M
+    
+    def __init__(self, ref_lat, ref_lon):
+        self.ref_lat = float(ref_lat)
+        self.ref_lon = float(ref_lon)
+        self.scale = np.array([
+            self.METERS_PER_DEGREE * math.cos(math.radians(self.ref_lat)),
+            self.METERS_PER_DEGREE,
+        ])
+    
+    @classmethod
+    def around(cls, points):
+        """Create a projection centered on the mean of (n, 2) [lat, lon] points."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return cls(points[:, 0].mean(), points[:, 1].mean())
+    
+    def to_meters(self, points):
+        """Project (n, 2) [lat, lon] rows to (n, 2) [x, y] meters."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return (points[:, ::-1] - (self.ref_lon, self.ref_lat)) * self.scale
+    
+    def to_latlon(self, xy):
+        """Convert (n, 2) [x, y] meters back to (n, 2) [lat, lon] rows."""
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        return (xy / self.scale + (self.ref_lon, self.ref_lat))[:, ::-1]
+    
+    def distances_to_point(self, points, lat, lon):
+        """Euclidean distance in meters from each [lat, lon] row to one location."""
+        xy = self.to_meters(points) - self.to_meters((lat, lon))
+        return np.hypot(xy[:, 0], xy[:, 1])
+    
+    def __repr__(self):
+        return f"LocalProjection(ref_lat={self.ref_lat:.5f}, ref_lon={self.ref_lon:.5f})"
+
+
+def bounding_box_around(lat, lon, radius_m):
+    """
+    Get the bounding box enclosing a circle around a point.
+    
+    Args:
+        lat, lon: Center in degrees
+        radius_m: Radius in meters
+    
+    Returns:
+        [minx, miny, maxx, maxy] in degrees (pyrosm order)
+    """
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-6)))
+    
+    return [lon - dlon, lat - dlat, lon + dlon, lat + dlat]
+
+
+def service_bounding_box(center, radius_m=None, points=None, margin_m=0):
+    """
+    Get the region of interest covering an office and the people it serves.
+    
+    Args:
+        center: (lat, lon) of the office
+        radius_m: Optional radius in meters around the office
+        points: Optional (lat, lon) points that must be inside, e.g. employees
+        margin_m: Extra distance in meters kept around the points
+    
+    Returns:
+        [minx, miny, maxx, maxy] in degrees, or None when neither a radius
+        nor points are given (no limit)
+    """
+    boxes = []
+    if radius_m is not None:
+        boxes.append(bounding_box_around(center[0], center[1], radius_m))
+    
+    if points is not None and len(points) > 0:
+        points = np.vstack([np.asarray(points, dtype=np.float64).reshape(-1, 2), center])
+        (min_lat, min_lon), (max_lat, max_lon) = points.min(axis=0).tolist(), points.max(axis=0).tolist()
+        south = bounding_box_around(min_lat, min_lon, margin_m)
+        north = bounding_box_around(max_lat, max_lon, margin_m)
+        boxes.append([south[0], south[1], north[2], north[3]])
+    
+    if not boxes:
+        return None
+    
+    return [
+        min(box[0] for box in boxes),
+        min(box[1] for box in boxes),
+        max(box[2] for box in boxes),
+        max(box[3] for box in boxes),
+    ]
@@ -0,0 +1,148 @@
+"""K Selection - parallel search for the number of clusters."""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+
+
+CRITERIA = ('elbow', 'silhouette')
+
+
+def _fit_k_block(task):
+    """
+    Fit consecutive k values, warm-starting each from the previous centers.
+    
+    The first k of a block uses k-means++; every next k starts from the
+    previous centers plus the point farthest from all of them.
+    """
+    coordinates, ks, random_state, n_init, with_silhouette = task
+    
+    results = []
+    centers = None
+    for k in ks:
+        start = time.perf_counter()
+        if centers is None or len(centers) != k - 1:
+            model = KMeans(n_clusters=k, random_state=random_state, n_init=n_init)
+        else:
+            nearest = np.min(((coordinates[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+            init = np.vstack([centers, coordinates[np.argmax(nearest)]])
+            model = KMeans(n_clusters=k, random_state=random_state, init=init, n_init=1)
+        
+        labels = model.fit_predict(coordinates)
+        centers = model.cluster_centers_
+        
+        silhouette = None
+        if with_silhouette and 1 < k < len(coordinates):
+            silhouette = float(silhouette_score(
+                coordinates, labels, sample_size=min(len(coordinates), 5000), random_state=random_state
+            ))
+        
+        results.append({
+            'k': k,
+            'inertia': float(model.inertia_),
+            'silhouette': silhouette,
+            'seconds': time.perf_counter() - start
+        })
+    
+    return results
+
+
+def find_elbow(ks, inertias):
+    """
+    Find the knee of a decreasing inertia curve.
+    
+    Inertia falls roughly geometrically with k, so the curve is taken in log
+    scale. Both axes are then scaled to [0, 1] and the knee is the k that
+    lies farthest below the straight line joining the first and last points.
+    """
+    ks = np.asarray(ks, dtype=np.float64)
+    inertias = np.log(np.maximum(np.asarray(inertias, dtype=np.float64), 1e-300))
+    if len(ks) < 3 or inertias[0] == inertias[-1]:
+        return int(ks[0])
+    
+    x = (ks - ks[0]) / (ks[-1] - ks[0])
+    y = (inertias - inertias.min()) / (inertias.max() - inertias.min())
+    return int(ks[np.argmax((1 - x) - y)])
+
+
+def select_k(coordinates, k_min=1, k_max=15, criterion='elbow', min_k=None, sample_size=20000,
+             max_workers=None, random_state=42, n_init=3):
+    """
+    Choose the number of clusters for a set of points.
+    
+    Candidate k values are split into contiguous blocks fitted in parallel
+    worker processes on a random subsample of the points.
+    
+    Args:
+        coordinates: Array of shape (n, 2) of planar points, e.g. meters from LocalProjection
+        k_min, k_max: Range of k values to try
+        criterion: 'elbow' (knee of the inertia curve) or 'silhouette' (best score)
+        min_k: Optional lower bound on k, e.g. employees / vehicle capacity
+        sample_size: Points used for fitting (None uses all)
+        max_workers: Worker processes (defaults to the CPU count)
+        random_state: Seed for subsampling and KMeans
+        n_init: KMeans restarts for the first k of every block
+    
+    Returns:
+        Dict with the chosen k, the score curve and timings
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unsupported k selection criterion: {criterion}")
+    
+    start = time.perf_counter()
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    n = len(coordinates)
+    
+    if sample_size and n > sample_size:
+        rng = np.random.default_rng(random_state)
+        coordinates = coordinates[rng.choice(n, sample_size, replace=False)]
+    
+    k_max = min(k_max, len(coordinates))
+    k_min = max(k_min, 2 if criterion == 'silhouette' else 1, min_k or 1)
+    if k_min > k_max:
+        return {
+            'k': max(k_min, min_k or 1), 'criterion': criterion, 'min_k': min_k,
+            'ks': [], 'inertias': [], 'silhouettes': [], 'fit_seconds': [],
+            'sample_size': len(coordinates), 'workers': 0,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+    
+    ks = list(range(k_min, k_max + 1))
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(ks)))
+    block_size = math.ceil(len(ks) / workers)
+    tasks = [
+        (coordinates, ks[i:i + block_size], random_state, n_init, criterion == 'silhouette')
+        for i in range(0, len(ks), block_size)
+    ]
+    
+    if len(tasks) == 1:
+        blocks = [_fit_k_block(tasks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+            blocks = list(executor.map(_fit_k_block, tasks))
+    
+    results = [result for block in blocks for result in block]
+    inertias = [result['inertia'] for result in results]
+    silhouettes = [result['silhouette'] for result in results]
+    
+    if criterion == 'silhouette':
+        k = ks[int(np.argmax(silhouettes))]
+    else:
+        k = find_elbow(ks, inertias)
+    
+    return {
+        'k': k,
+        'criterion': criterion,
+        'min_k': min_k,
+        'ks': ks,
+        'inertias': inertias,
+        'silhouettes': silhouettes,
+        'fit_seconds': [round(result['seconds'], 3) for result in results],
+        'sample_size': len(coordinates),
+        'workers': len(tasks),
+        'seconds': round(time.perf_counter() - start, 3)
+    }
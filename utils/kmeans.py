@@ -1,5 +1,5 @@
-"""KMeans Clusterer - wrapper for scikit-learn KMeans."""
-from sklearn.cluster import KMeans
+"""KMeans Clusterers - wrappers for scikit-learn KMeans and MiniBatchKMeans, plus capacity-balanced KMeans."""
+from sklearn.cluster import KMeans, MiniBatchKMeans
 import numpy as np
 
 
@@ -14,13 +14,15 @@ class KMeansClusterer:
         self.cluster_centers_ = None
         self.labels_ = None
         self.inertia_ = None
+        self.sample_weight_ = None
     
-    def fit(self, coordinates):
+    def fit(self, coordinates, sample_weight=None):
         """
         Fit KMeans model to coordinates.
         
         Args:
-            coordinates: Array of shape (n_samples, 2) with [lat, lon]
+            coordinates: Array of shape (n_samples, 2), e.g. [x, y] meters from LocalProjection
+            sample_weight: Optional weight per row, e.g. employees per demand point
         
         Returns:
             self
@@ -31,7 +33,8 @@ class KMeansClusterer:
             n_init=self.n_init
         )
         
-        self.labels_ = self.model.fit_predict(coordinates)
+        self.labels_ = self.model.fit_predict(coordinates, sample_weight=sample_weight)
+        self.sample_weight_ = sample_weight
         self.cluster_centers_ = self.model.cluster_centers_
         self.inertia_ = self.model.inertia_
         
@@ -64,6 +67,339 @@ class KMeansClusterer:
         
         return self.model.predict(coordinates)
     
+    def get_cluster_sizes(self):
+        """Return dict of cluster_id -> count."""
+        if self.labels_ is None:
+            raise ValueError("Model has not been fit yet!")
+        
+        if self.sample_weight_ is not None:
+            counts = np.bincount(self.labels_, weights=self.sample_weight_, minlength=self.n_clusters)
+            return {i: int(count) for i, count in enumerate(counts) if count > 0}
+        
+        unique, counts = np.unique(self.labels_, return_counts=True)
+        return dict(zip(unique, counts))
+    
+    def get_stats(self):
+        """Return clustering statistics."""
+        if self.labels_ is None:
+            raise ValueError("Model has not been fit yet!")
+        
+        return {
+            'n_clusters': self.n_clusters,
+            'inertia': self.inertia_,
+            'cluster_sizes': self.get_cluster_sizes()
+        }
+
+
+class MiniBatchKMeansClusterer:
+    """
+    Mini-batch KMeans for very large employee sets.
+    
+    Centers are updated from random batches instead of full passes, so time
+    and memory grow with the batch size rather than the number of employees.
+    Data that arrives in pieces can be fed with partial_fit.
+    """
+    
+    def __init__(self, n_clusters=5, random_state=42, batch_size=4096, max_iter=100, n_init=3):
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.n_init = n_init
+        self.model = None
+        self.cluster_centers_ = None
+        self.labels_ = None
+        self.inertia_ = None
+        self.sample_weight_ = None
+    
+    def _create_model(self):
+        return MiniBatchKMeans(
+            n_clusters=self.n_clusters,
+            random_state=self.random_state,
+            batch_size=self.batch_size,
+            max_iter=self.max_iter,
+            n_init=self.n_init
+        )
+    
+    def fit(self, coordinates, sample_weight=None):
+        """
+        Fit the model to all coordinates.
+        
+        Args:
+            coordinates: Array of shape (n_samples, 2), e.g. [x, y] meters from LocalProjection
+            sample_weight: Optional weight per row, e.g. employees per demand point
+        
+        Returns:
+            self
+        """
+        self.model = self._create_model()
+        self.model.fit(coordinates, sample_weight=sample_weight)
+        
+        self.labels_ = self.model.labels_
+        self.cluster_centers_ = self.model.cluster_centers_
+        self.inertia_ = self.model.inertia_
+        self.sample_weight_ = sample_weight
+        
+        return self
+    
+    def partial_fit(self, coordinates, sample_weight=None):
+        """
+        Update the centers with one batch of coordinates.
+        
+        Labels and inertia describe only the latest batch; call predict or
+        score on the full data once all batches are in.
+        
+        Returns:
+            self
+        """
+        if self.model is None:
+            self.model = self._create_model()
+        
+        self.model.partial_fit(coordinates, sample_weight=sample_weight)
+        
+        self.labels_ = self.model.labels_
+        self.cluster_centers_ = self.model.cluster_centers_
+        self.inertia_ = self.model.inertia_
+        self.sample_weight_ = sample_weight
+        
+        return self
+    
+    def fit_batches(self, batches):
+        """
+        Fit from an iterable of coordinate arrays (or (coordinates, weights) pairs).
+        
+        Returns:
+            self
+        """
+        self.model = None
+        for batch in batches:
+            if isinstance(batch, tuple):
+                self.partial_fit(batch[0], sample_weight=batch[1])
+            else:
+                self.partial_fit(batch)
+        
+        return self
+    
+    def predict(self, coordinates):
+        """Predict cluster for new coordinates."""
+        if self.model is None:
+            raise ValueError("Model has not been fit yet!")
+        
+        return self.model.predict(coordinates)
+    
+    def score(self, coordinates, sample_weight=None):
+        """Return the inertia of the current centers on coordinates, in chunks."""
+        if self.model is None:
+            raise ValueError("Model has not been fit yet!")
+        
+        coordinates = np.asarray(coordinates)
+        inertia = 0.0
+        for start in range(0, len(coordinates), self.batch_size * 16):
+            end = start + self.batch_size * 16
+            weights = None if sample_weight is None else sample_weight[start:end]
+            inertia -= self.model.score(coordinates[start:end], sample_weight=weights)
+        
+        return inertia
+    
+    def convergence_report(self, coordinates, sample_weight=None, full_n_init=10):
+        """
+        Compare this model with full-batch KMeans on the same data.
+        
+        Fits a fresh mini-batch model and a KMeans model with the same seed
+        and reports inertia and fit time of both.
+        
+        Returns:
+            Dict with inertias, the relative inertia gap and timings
+        """
+        import time
+        
+        start = time.perf_counter()
+        self.fit(coordinates, sample_weight=sample_weight)
+        minibatch_seconds = time.perf_counter() - start
+        minibatch_inertia = self.score(coordinates, sample_weight=sample_weight)
+        
+        start = time.perf_counter()
+        full = KMeansClusterer(
+            n_clusters=self.n_clusters,
+            random_state=self.random_state,
+            n_init=full_n_init
+        ).fit(coordinates, sample_weight=sample_weight)
+        full_seconds = time.perf_counter() - start
+        
+        return {
+            'n_samples': len(coordinates),
+            'n_clusters': self.n_clusters,
+            'batch_size': self.batch_size,
+            'minibatch_inertia': minibatch_inertia,
+            'full_inertia': full.inertia_,
+            'relative_gap': (minibatch_inertia - full.inertia_) / full.inertia_ if full.inertia_ else 0.0,
+            'minibatch_steps': int(self.model.n_steps_),
+            'minibatch_seconds': round(minibatch_seconds, 3),
+            'full_seconds': round(full_seconds, 3)
+        }
+    
+    def get_cluster_sizes(self):
+        """Return dict of cluster_id -> count."""
+        if self.labels_ is None:
+            raise ValueError("Model has not been fit yet!")
+        
+        counts = np.bincount(self.labels_, weights=self.sample_weight_, minlength=self.n_clusters)
+        return {i: int(count) for i, count in enumerate(counts) if count > 0}
+    
+    def get_stats(self):
+        """Return clustering statistics."""
+        if self.labels_ is None:
+            raise ValueError("Model has not been fit yet!")
+        
+        return {
+            'n_clusters': self.n_clusters,
+            'inertia': self.inertia_,
+            'batch_size': self.batch_size,
+            'cluster_sizes': self.get_cluster_sizes()
+        }
+
+
+class BalancedKMeansClusterer:
+    """
+    Size-constrained KMeans: no cluster gets more than `capacity` points.
+    
+    Alternates between a capacity-constrained assignment, solved as a
+    min-cost flow with OR-Tools, and moving every center to the mean of its
+    points. Each point only gets arcs to its nearest candidate centers plus
+    an expensive overflow arc, so the flow is always feasible; the few points
+    that overflow are placed greedily in the nearest center with free seats.
+    
+    Coordinates must be planar meters (see utils.geo.LocalProjection), since
+    flow costs are whole squared meters.
+    """
+    
+    def __init__(self, n_clusters=5, capacity=50, random_state=42, n_init=1, max_iter=30,
+                 n_candidates=8, tol=0.01):
+        self.n_clusters = n_clusters
+        self.capacity = capacity
+        self.random_state = random_state
+        self.n_init = n_init
+        self.max_iter = max_iter
+        self.n_candidates = n_candidates
+        self.tol = tol
+        self.cluster_centers_ = None
+        self.labels_ = None
+        self.inertia_ = None
+        self.n_iter_ = 0
+    
+    def _assign(self, xy, centers):
+        """Assign points to centers without exceeding the capacity."""
+        from ortools.graph.python import min_cost_flow
+        from scipy.spatial import cKDTree
+        
+        n, k = len(xy), len(centers)
+        distances, candidates = cKDTree(centers).query(xy, k=min(k, self.n_candidates))
+        distances = distances.reshape(n, -1)
+        candidates = candidates.reshape(n, -1)
+        costs = np.round(distances ** 2).astype(np.int64)
+        
+        # Nodes: points 0..n-1, centers n..n+k-1, overflow n+k, sink n+k+1
+        overflow, sink = n + k, n + k + 1
+        flow = min_cost_flow.SimpleMinCostFlow()
+        point_arcs = flow.add_arcs_with_capacity_and_unit_cost(
+            np.repeat(np.arange(n), candidates.shape[1]),
+            n + candidates.ravel(),
+            np.ones(candidates.size, dtype=np.int64),
+            costs.ravel()
+        )
+        overflow_arcs = flow.add_arcs_with_capacity_and_unit_cost(
+            np.arange(n),
+            np.full(n, overflow),
+            np.ones(n, dtype=np.int64),
+            np.full(n, 2 * int(costs.max()) + 1)
+        )
+        flow.add_arcs_with_capacity_and_unit_cost(
+            np.concatenate([n + np.arange(k), [overflow]]),
+            np.full(k + 1, sink),
+            np.concatenate([np.full(k, self.capacity, dtype=np.int64), [n]]),
+            np.zeros(k + 1, dtype=np.int64)
+        )
+        flow.set_nodes_supplies(
+            np.arange(n + k + 2),
+            np.concatenate([np.ones(n, dtype=np.int64), np.zeros(k + 1, dtype=np.int64), [-n]])
+        )
+        
+        if flow.solve() != flow.OPTIMAL:
+            raise ValueError("Capacity-constrained assignment failed")
+        
+        used = flow.flows(point_arcs).reshape(n, -1) > 0
+        labels = candidates[np.arange(n), np.argmax(used, axis=1)]
+        
+        spilled = np.flatnonzero(flow.flows(overflow_arcs) > 0)
+        if len(spilled):
+            labels[spilled] = -1
+            free = self.capacity - np.bincount(labels[labels >= 0], minlength=k)
+            d2 = ((xy[spilled, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            # Points closest to a center go first, each to its nearest center with a free seat
+            for i in np.argsort(d2.min(axis=1)):
+                j = int(np.argmin(np.where(free > 0, d2[i], np.inf)))
+                labels[spilled[i]] = j
+                free[j] -= 1
+        
+        return labels
+    
+    def fit(self, coordinates, sample_weight=None):
+        """
+        Fit balanced clusters to coordinates.
+        
+        Args:
+            coordinates: Array of shape (n_samples, 2) in planar meters
+            sample_weight: Not supported; every row counts as one seat
+        
+        Returns:
+            self
+        """
+        if sample_weight is not None:
+            raise ValueError("BalancedKMeansClusterer does not support sample weights")
+        
+        xy = np.asarray(coordinates, dtype=np.float64)
+        if self.n_clusters * self.capacity < len(xy):
+            raise ValueError(
+                f"{self.n_clusters} clusters of {self.capacity} cannot hold {len(xy)} points"
+            )
+        
+        centers = KMeans(
+            n_clusters=self.n_clusters,
+            random_state=self.random_state,
+            n_init=self.n_init
+        ).fit(xy).cluster_centers_
+        
+        labels = None
+        for iteration in range(1, self.max_iter + 1):
+            new_labels = self._assign(xy, centers)
+            
+            counts = np.bincount(new_labels, minlength=self.n_clusters)
+            occupied = counts > 0
+            for axis in range(2):
+                sums = np.bincount(new_labels, weights=xy[:, axis], minlength=self.n_clusters)
+                centers[occupied, axis] = sums[occupied] / counts[occupied]
+            
+            self.n_iter_ = iteration
+            converged = labels is not None and np.mean(labels != new_labels) <= self.tol
+            labels = new_labels
+            if converged:
+                break
+        
+        self.labels_ = labels
+        self.cluster_centers_ = centers
+        self.inertia_ = float(((xy - centers[labels]) ** 2).sum())
+        
+        return self
+    
+    def predict(self, coordinates):
+        """Predict the nearest center for new coordinates (capacity is not enforced)."""
+        if self.cluster_centers_ is None:
+            raise ValueError("Model has not been fit yet!")
+        
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        d2 = ((coordinates[:, None, :] - self.cluster_centers_[None, :, :]) ** 2).sum(axis=2)
+        return np.argmin(d2, axis=1)
+    
     def get_cluster_sizes(self):
         """Return dict of cluster_id -> count."""
         if self.labels_ is None:
@@ -80,5 +416,7 @@ class KMeansClusterer:
         return {
             'n_clusters': self.n_clusters,
             'inertia': self.inertia_,
+            'capacity': self.capacity,
+            'iterations': self.n_iter_,
             'cluster_sizes': self.get_cluster_sizes()
         }
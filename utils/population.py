@@ -0,0 +1,168 @@
+"""Population Generator - large synthetic employee sets generated in parallel chunks."""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import shapely
+
+from utils.data_generator import DataGenerator
+
+
+POPULATION_DTYPE = np.dtype([('id', '<i8'), ('lat', '<f8'), ('lon', '<f8')])
+
+# Per-process sampler, created once by the pool initializer
+_worker_generator = None
+
+
+def _init_worker(urban_wkb, bounds, sampling, density):
+    global _worker_generator
+    _worker_generator = DataGenerator.from_area(
+        shapely.from_wkb(urban_wkb), bounds, sampling=sampling, density=density
+    )
+
+
+def _generate_chunk(task):
+    """Sample exactly `size` points for one chunk from its own seed."""
+    index, size, seed_sequence = task
+    rng = np.random.default_rng(seed_sequence)
+
+    lats, lons = [], []
+    remaining = size
+    while remaining > 0:
+        lat, lon = _worker_generator.sample(remaining, rng)
+        if len(lat) == 0:
+            raise ValueError("No residential area to sample from")
+        lats.append(lat)
+        lons.append(lon)
+        remaining -= len(lat)
+
+    return index, np.concatenate(lats), np.concatenate(lons)
+
+
+class PopulationGenerator:
+    """
+    Generates millions of synthetic employees for scale tests.
+
+    The job is split into fixed-size chunks, each seeded with its own child
+    of the master seed (numpy SeedSequence.spawn), so the output depends only
+    on the seed and chunk size, never on the worker count. Chunks are sampled
+    in a process pool and written to disk in order as they finish, so memory
+    stays bounded by a few chunks.
+    """
+
+    def __init__(self, osm_file="data/istanbul-center.osm.pbf", sampling='triangulated', density=None,
+                 bundle_dir=None, bounding_box=None, chunk_size=100_000, max_workers=None):
+        """
+        Args:
+            osm_file: Path to the .osm.pbf file
+            sampling: DataGenerator sampling mode used in every chunk
+            density: Optional density callable for triangulated sampling; must
+                be a module-level function so it can be sent to workers
+            bundle_dir: Optional region bundle directory
+            bounding_box: Optional [minx, miny, maxx, maxy] region of interest
+            chunk_size: Employees per chunk (part of what the output depends on)
+            max_workers: Worker processes (defaults to the CPU count)
+        """
+        self.data_generator = DataGenerator(
+            osm_file=osm_file,
+            sampling=sampling,
+            bundle_dir=bundle_dir,
+            bounding_box=bounding_box
+        )
+        self.sampling = sampling
+        self.density = density
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _tasks(self, n, seed):
+        n_chunks = -(-n // self.chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+        for index, seed_sequence in enumerate(seeds):
+            size = min(self.chunk_size, n - index * self.chunk_size)
+            yield index, size, seed_sequence
+
+    def _iter_chunks(self, n, seed):
+        """Yield (index, lat, lon) for every chunk in order."""
+        urban_area, bounds = self.data_generator.get_urban_area()
+        initargs = (shapely.to_wkb(urban_area), bounds, self.sampling, self.density)
+
+        if self.max_workers <= 1:
+            _init_worker(*initargs)
+            for task in self._tasks(n, seed):
+                yield _generate_chunk(task)
+            return
+
+        # Keep a bounded window of chunks in flight so finished but unwritten
+        # chunks cannot pile up in memory
+        window = 2 * self.max_workers
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            pending = []
+            for task in self._tasks(n, seed):
+                pending.append(executor.submit(_generate_chunk, task))
+                if len(pending) >= window:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def generate(self, n, output_file, seed=42):
+        """
+        Generate n employees and stream them to disk.
+
+        Args:
+            n: Number of employees
+            output_file: '.parquet' (id, lat, lon columns; needs pyarrow) or
+                '.npy' (structured id/lat/lon array, open with mmap_mode='r')
+            seed: Master random seed
+
+        Returns:
+            Dict with output_file, employees, chunks, workers and seconds
+        """
+        extension = os.path.splitext(output_file)[1].lower()
+        if extension not in ('.parquet', '.npy'):
+            raise ValueError(f"Unsupported population file format: {output_file}")
+
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        start = time.time()
+        chunks = 0
+
+        if extension == '.parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("pyarrow is required to write Parquet files")
+
+            schema = pa.schema([('id', pa.int64()), ('lat', pa.float64()), ('lon', pa.float64())])
+            with pq.ParquetWriter(output_file, schema) as writer:
+                for index, lat, lon in self._iter_chunks(n, seed):
+                    ids = np.arange(len(lat), dtype=np.int64) + index * self.chunk_size + 1
+                    writer.write_table(pa.table({'id': ids, 'lat': lat, 'lon': lon}, schema=schema))
+                    chunks += 1
+        else:
+            output = np.lib.format.open_memmap(output_file, mode='w+', dtype=POPULATION_DTYPE, shape=(n,))
+            for index, lat, lon in self._iter_chunks(n, seed):
+                offset = index * self.chunk_size
+                rows = output[offset:offset + len(lat)]
+                rows['id'] = np.arange(len(lat)) + offset + 1
+                rows['lat'] = lat
+                rows['lon'] = lon
+                chunks += 1
+            output.flush()
+            del output
+
+        seconds = time.time() - start
+        print(f"    Generated {n} employees in {chunks} chunks with {self.max_workers} workers "
+              f"({seconds:.1f}s): {output_file}")
+
+        return {
+            'output_file': output_file,
+            'employees': n,
+            'chunks': chunks,
+            'workers': self.max_workers,
+            'seconds': round(seconds, 2)
+        }
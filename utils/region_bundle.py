@@ -0,0 +1,265 @@
+"""Region Bundle - compiled on-disk cache of the data parsed from an OSM pbf."""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import shapely
+
+
+# pyrosm filters used to extract the region; they are part of the bundle key
+RESIDENTIAL_FILTER = {"landuse": ["residential"]}
+TRANSIT_STOP_FILTER = {
+    "highway": ["bus_stop"],
+    "railway": ["subway_entrance", "tram_stop"],
+    "public_transport": ["platform", "stop_position"],
+    "amenity": ["bus_station"]
+}
+
+BUNDLE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def parse_residential_area(osm, bounding_box=None):
+    """
+    Extract residential land use from a pyrosm OSM object.
+
+    Args:
+        osm: pyrosm OSM object
+        bounding_box: Optional [minx, miny, maxx, maxy]; polygons reaching
+            past it are clipped so samples stay inside the region
+
+    Returns:
+        Tuple of (shapely geometry of the residential union, bounds array)
+    """
+    landuse = osm.get_data_by_custom_criteria(
+        custom_filter=RESIDENTIAL_FILTER,
+        filter_type="keep",
+        keep_nodes=False,
+        keep_ways=True,
+        keep_relations=True
+    )
+
+    urban_area = landuse.unary_union
+    if bounding_box is not None:
+        urban_area = shapely.clip_by_rect(urban_area, *bounding_box)
+
+    return urban_area, np.asarray(shapely.bounds(urban_area), dtype=np.float64)
+
+
+def parse_transit_stops(osm):
+    """
+    Extract bus, tram and metro stops from a pyrosm OSM object.
+
+    Returns:
+        float64 array of shape (n, 2) with [lat, lon] rows
+    """
+    stops = osm.get_data_by_custom_criteria(
+        custom_filter=TRANSIT_STOP_FILTER,
+        filter_type="keep",
+        keep_nodes=True,
+        keep_ways=False,
+        keep_relations=False
+    )
+
+    if stops is None or len(stops) == 0:
+        return np.empty((0, 2), dtype=np.float64)
+
+    geometries = np.asarray(stops.geometry.values)
+    points = geometries[shapely.get_type_id(geometries) == 0]
+    return np.column_stack([shapely.get_y(points), shapely.get_x(points)]).astype(np.float64)
+
+
+class RegionBundle:
+    """
+    Residential area, transit stops and road graphs compiled from one pbf.
+
+    A bundle lives in its own directory keyed by the pbf path, modification
+    time, size, region bounding box and parse settings. Any change to those
+    selects a different directory, and bundles left behind by an older
+    version of the same pbf are deleted when the new one is built. Arrays are
+    stored as .npy files and opened memory-mapped, so loading a built bundle
+    takes milliseconds instead of a pyrosm parse.
+    """
+
+    def __init__(self, osm_file, bundle_dir="data/bundles", bounding_box=None):
+        """
+        Args:
+            osm_file: Path to the .osm.pbf file
+            bundle_dir: Directory holding compiled bundles
+            bounding_box: Optional [minx, miny, maxx, maxy] the region was cropped to
+        """
+        self.osm_file = osm_file
+        self.bundle_dir = bundle_dir
+        self.bounding_box = None if bounding_box is None else [float(v) for v in bounding_box]
+
+        stat = os.stat(osm_file)
+        self._source = {
+            'osm_file': os.path.abspath(osm_file),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+        }
+        self.key = self._make_key()
+
+        stem = os.path.basename(osm_file).split('.')[0]
+        self.path = os.path.join(bundle_dir, f"{stem}-{self.key[:16]}")
+
+        self._urban_area = None
+        self._bounds = None
+        self._stops = None
+
+    def _make_key(self):
+        """Hash everything that changes the bundle contents."""
+        from routing_engines.graph import HIGHWAY_SPEEDS_KMH, NETWORK_SPEEDS_KMH, DEFAULT_SPEED_KMH
+
+        settings = {
+            'version': BUNDLE_VERSION,
+            'source': self._source,
+            'bounding_box': self.bounding_box,
+            'residential_filter': RESIDENTIAL_FILTER,
+            'transit_stop_filter': TRANSIT_STOP_FILTER,
+            'speeds': [HIGHWAY_SPEEDS_KMH, NETWORK_SPEEDS_KMH, DEFAULT_SPEED_KMH],
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def is_built(self):
+        """Return True if the region data of this bundle is on disk."""
+        return os.path.exists(self._file(MANIFEST_FILE))
+
+    def build(self, osm=None):
+        """
+        Parse the pbf and write the region data.
+
+        Args:
+            osm: Optional pyrosm OSM object already opened on the same file
+
+        Returns:
+            self
+        """
+        if osm is None:
+            from pyrosm import OSM
+            osm = OSM(self.osm_file, bounding_box=self.bounding_box)
+
+        start = time.time()
+        urban_area, bounds = parse_residential_area(osm, bounding_box=self.bounding_box)
+        stops = parse_transit_stops(osm)
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file("residential.wkb"), 'wb') as f:
+            f.write(shapely.to_wkb(urban_area))
+        np.save(self._file("bounds.npy"), bounds)
+        np.save(self._file("stops.npy"), stops)
+
+        # The manifest is written last and marks the bundle as complete
+        with open(self._file(MANIFEST_FILE), 'w') as f:
+            json.dump({'key': self.key, 'created_at': time.time(), **self._source}, f, indent=2)
+
+        self._remove_stale()
+        print(f"    Region bundle built in {time.time() - start:.1f}s: {self.path}")
+
+        # Prepared like a loaded bundle, so the first run gets fast containment tests too
+        shapely.prepare(urban_area)
+        self._urban_area = urban_area
+        self._bounds = bounds
+        self._stops = stops
+        return self
+
+    def _remove_stale(self):
+        """Delete bundles built from an older version of the same pbf."""
+        if not os.path.isdir(self.bundle_dir):
+            return
+
+        for name in os.listdir(self.bundle_dir):
+            path = os.path.join(self.bundle_dir, name)
+            if path == self.path or not os.path.isdir(path):
+                continue
+
+            # Graphs can be stored before the region data, so any manifest will do
+            manifests = [os.path.join(path, MANIFEST_FILE)] + [
+                os.path.join(path, sub, MANIFEST_FILE) for sub in os.listdir(path) if sub.startswith('graph-')
+            ]
+            manifest = None
+            for manifest_file in manifests:
+                try:
+                    with open(manifest_file) as f:
+                        manifest = json.load(f)
+                    break
+                except (OSError, ValueError):
+                    continue
+            if manifest is None:
+                continue
+
+            same_file = manifest.get('osm_file') == self._source['osm_file']
+            changed = (manifest.get('mtime_ns'), manifest.get('size')) != (self._source['mtime_ns'], self._source['size'])
+            if same_file and changed:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def ensure(self):
+        """Build the bundle if it is missing, then return self."""
+        if not self.is_built():
+            self.build()
+        return self
+
+    @property
+    def urban_area(self):
+        """Residential union as a prepared shapely geometry."""
+        if self._urban_area is None:
+            with open(self._file("residential.wkb"), 'rb') as f:
+                self._urban_area = shapely.from_wkb(f.read())
+            shapely.prepare(self._urban_area)
+        return self._urban_area
+
+    @property
+    def bounds(self):
+        """[minx, miny, maxx, maxy] of the residential area."""
+        if self._bounds is None:
+            self._bounds = np.load(self._file("bounds.npy"))
+        return self._bounds
+
+    @property
+    def stops(self):
+        """Transit stops as a read-only (n, 2) [lat, lon] array."""
+        if self._stops is None:
+            self._stops = np.load(self._file("stops.npy"), mmap_mode='r')
+        return self._stops
+
+    def _graph_dir(self, network_type):
+        return self._file(f"graph-{network_type}")
+
+    def load_graph(self, network_type):
+        """Return the stored road graph for a network type, or None if not built."""
+        from routing_engines.graph import RoadGraph
+
+        directory = self._graph_dir(network_type)
+        if not os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            return None
+
+        arrays = {
+            name[:-4]: np.load(os.path.join(directory, name), mmap_mode='r')
+            for name in os.listdir(directory) if name.endswith('.npy')
+        }
+        return RoadGraph.from_arrays(arrays, network_type=network_type)
+
+    def save_graph(self, graph):
+        """Store a road graph in the bundle."""
+        directory = self._graph_dir(graph.network_type)
+        os.makedirs(directory, exist_ok=True)
+
+        for name, array in graph.to_arrays().items():
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+
+        with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+            json.dump({
+                'key': self.key,
+                'network_type': graph.network_type,
+                'nodes': graph.n_nodes,
+                'edges': graph.n_edges,
+                **self._source
+            }, f, indent=2)
+
+        self._remove_stale()
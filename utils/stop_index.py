@@ -0,0 +1,100 @@
+"""Stop Index - spatial queries over transit stop coordinates."""
+import threading
+
+import numpy as np
+import shapely
+
+from utils.geo import EARTH_RADIUS_M
+
+
+class StopIndex:
+    """
+    Transit stops as a coordinate array with lazily built spatial indexes.
+
+    A haversine BallTree answers radius and nearest-neighbour queries in
+    meters; a shapely STRtree answers "stops near this route line" queries.
+    Build one index per run and share it between clusters.
+    """
+
+    def __init__(self, stops):
+        """
+        Args:
+            stops: Array-like of shape (n, 2) with [lat, lon] rows
+        """
+        self.coords = np.asarray(stops, dtype=np.float64).reshape(-1, 2)
+        self._ball_tree = None
+        self._str_tree = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def ball_tree(self):
+        """BallTree over the stops in radians with the haversine metric."""
+        if self._ball_tree is None:
+            from sklearn.neighbors import BallTree
+            with self._lock:
+                if self._ball_tree is None:
+                    self._ball_tree = BallTree(np.radians(self.coords), metric='haversine')
+        return self._ball_tree
+
+    @property
+    def str_tree(self):
+        """STRtree of stop points in (lat, lon) order, matching RouteGeometry.line."""
+        if self._str_tree is None:
+            with self._lock:
+                if self._str_tree is None:
+                    self._str_tree = shapely.STRtree(shapely.points(self.coords))
+        return self._str_tree
+
+    def within_radius(self, points, radius_m):
+        """
+        Find stops within a distance of each point.
+
+        Args:
+            points: Array-like of (lat, lon) query points
+            radius_m: Search radius in meters
+
+        Returns:
+            List with one sorted index array per query point
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(self) == 0:
+            return [np.empty(0, dtype=np.intp) for _ in range(len(points))]
+
+        indices = self.ball_tree.query_radius(np.radians(points), r=radius_m / EARTH_RADIUS_M)
+        return [np.sort(idx) for idx in indices]
+
+    def nearest(self, points, k=1):
+        """
+        Find the k nearest stops of each point.
+
+        Returns:
+            Tuple of (distances in meters, indices), both of shape (n_points, k)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        k = min(k, len(self))
+        if k == 0:
+            empty = np.empty((len(points), 0))
+            return empty, empty.astype(np.intp)
+
+        distances, indices = self.ball_tree.query(np.radians(points), k=k)
+        return distances * EARTH_RADIUS_M, indices
+
+    def within_line(self, line, distance):
+        """
+        Find stops within a distance of a line.
+
+        Args:
+            line: Shapely geometry in (lat, lon) coordinate order
+            distance: Maximum distance in degrees
+
+        Returns:
+            Sorted index array of matching stops
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        indices = self.str_tree.query(line, predicate='dwithin', distance=distance)
+        return np.sort(indices)